@@ -1,18 +1,45 @@
 import asyncio
+import logging
+import logging.handlers
+import queue
 from pathlib import Path
 import sys
 import os
 
-sys.path.append(os.path.join(os.path.dirname(__file__), 'src'))
+# Single import root: every module is imported as a top-level package from src/
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
 
 from torrent.metainfo import TorrentMeta
 from tracker.tracker_client import TrackerClient
 from session_manager import SessionManager
 
+# Upper bound on simultaneous outgoing peer handshakes
+MAX_CONCURRENT_CONNECTS = 16
+# Overall deadline for TCP connect + handshake, so dead peers free their slot fast
+PEER_CONNECT_TIMEOUT = 8.0
+
+
+def setup_logging(level=logging.INFO):
+    """
+    Route log records through a queue so formatting and console I/O happen
+    on a listener thread instead of the event loop. Returns the listener.
+    """
+    log_queue = queue.SimpleQueue()
+    console = logging.StreamHandler()
+    console.setFormatter(logging.Formatter("%(message)s"))
+
+    root = logging.getLogger()
+    root.setLevel(level)
+    root.addHandler(logging.handlers.QueueHandler(log_queue))
+
+    listener = logging.handlers.QueueListener(log_queue, console)
+    listener.start()
+    return listener
+
 
 async def main():
     torrent_path = Path("torrents/big-buck-bunny.torrent")
-    meta = TorrentMeta(torrent_path)
+    meta = await TorrentMeta.load(torrent_path)
     print("announce:", meta.announce)
     print("announce_list:", meta.announce_list)
     print("Computed info_hash:", meta.info_hash.hex())
@@ -23,7 +50,10 @@ async def main():
 
 
     tracker = TrackerClient(meta, peer_id)
-    peers = await tracker.announce()
+    try:
+        peers = await tracker.announce()
+    finally:
+        await tracker.close()
 
     print(f"[Main] Tracker returned {len(peers)} peers")
 
@@ -31,12 +61,25 @@ async def main():
     # This enables "fast resume" - downloading starts as soon as the first peer connects.
     session_task = asyncio.create_task(session.start())
 
-    # Connect to peers in parallel
+    # Connect to peers in parallel, capping the number of half-open sockets
+    connect_sem = asyncio.Semaphore(MAX_CONCURRENT_CONNECTS)
+
+    async def connect_peer(ip, port):
+        async with connect_sem:
+            try:
+                return await asyncio.wait_for(
+                    session.add_peer(ip, port),
+                    timeout=PEER_CONNECT_TIMEOUT,
+                )
+            except (asyncio.TimeoutError, OSError):
+                print(f"[Main] Gave up on peer {ip}:{port}")
+                return None
+
     connect_tasks = [
-        session.add_peer(ip, port) 
+        connect_peer(ip, port)
         for ip, port in peers[:50]
     ]
-    connect_future = asyncio.gather(*connect_tasks)
+    connect_future = asyncio.gather(*connect_tasks, return_exceptions=True)
 
     # Race between session completion (download done) and connection attempts
     done, pending = await asyncio.wait(
@@ -58,4 +101,8 @@ async def main():
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    log_listener = setup_logging()
+    try:
+        asyncio.run(main())
+    finally:
+        log_listener.stop()
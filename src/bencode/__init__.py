@@ -1,8 +1,8 @@
 """
 Bencode package for encoding and decoding BitTorrent data.
 """
-from .decoder import decode
+from .decoder import BencodeDecodeError, decode
 from .encoder import encode
 from .structure import BencodeDict, BencodeInt, BencodeList, BencodeString
 
-__all__ = ['decode', 'encode', 'BencodeInt', 'BencodeString', 'BencodeList', 'BencodeDict']
\ No newline at end of file
+__all__ = ['decode', 'encode', 'BencodeDecodeError', 'BencodeInt', 'BencodeString', 'BencodeList', 'BencodeDict']
\ No newline at end of file
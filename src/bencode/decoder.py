@@ -3,8 +3,33 @@ Bencode decoder for BitTorrent metainfo and tracker responses.
 """
 from .structure import BencodeDict, BencodeInt, BencodeList, BencodeString
 
-
-class BencodeDecodeError(Exception):
+# Token kinds, looked up by the byte at the cursor through _TOKEN_KIND
+_T_INVALID = 0
+_T_STRING = 1
+_T_INT = 2
+_T_LIST = 3
+_T_DICT = 4
+_T_END = 5
+
+_TOKEN_KIND = bytearray(256)
+for _digit in b"0123456789":
+    _TOKEN_KIND[_digit] = _T_STRING
+_TOKEN_KIND[ord('i')] = _T_INT
+_TOKEN_KIND[ord('l')] = _T_LIST
+_TOKEN_KIND[ord('d')] = _T_DICT
+_TOKEN_KIND[ord('e')] = _T_END
+_TOKEN_KIND = bytes(_TOKEN_KIND)
+
+_ZERO = ord('0')
+_COLON = ord(':')
+_MINUS = ord('-')
+_END_BYTE = ord('e')
+
+# Marks a dict frame that is waiting for its next key (or a list frame)
+_NO_KEY = object()
+
+
+class BencodeDecodeError(ValueError):
     """Custom exception for Bencode decoding errors."""
     pass
 
@@ -12,111 +37,134 @@ class BencodeDecodeError(Exception):
 class BencodeDecoder:
     """
     Decodes Bencoded byte strings into Python objects.
+
+    By default values are wrapped in the Bencode* structure types. With
+    raw=True the decoder returns native int/bytes/list/dict instead, which
+    skips one wrapper allocation per node.
     """
-    def __init__(self, data: bytes):
+    def __init__(self, data: bytes, raw: bool = False):
         self.data = data
+        self.raw = raw
         self.i = 0  # cursor index
+        # (start, end) byte range of the top-level 'info' value, if present
+        self.info_span = None
 
     def decode(self):
-        """Main decode entry point. Decodes the entire Bencoded data."""
-        result = self._parse_value()
-        return result
-
-    # --------------------------
-    # Low-level utilities
-    # --------------------------
-
-    def _peek(self):
-        if self.i >= len(self.data):
-            raise BencodeDecodeError("Unexpected end of input")
-        return self.data[self.i:self.i+1]
-
-    def _consume(self, n=1):
-        """Moves cursor forward by n bytes and returns the consumed chunk."""
-        chunk = self.data[self.i:self.i+n]
-        self.i += n
-        return chunk
-
-    # --------------------------
-    # Parsing functions
-    # --------------------------
-
-    def _parse_value(self):
-        ch = self._peek()
-
-        if ch == b'i':
-            return self._parse_int()
-
-        if ch.isdigit(): # Bencode strings start with length, which is a digit
-            return self._parse_string()
-
-        if ch == b'l':
-            return self._parse_list()
-
-        if ch == b'd':
-            return self._parse_dict()
-
-        raise BencodeDecodeError(f"Invalid token at index {self.i}: {ch}")
-
-    def _parse_int(self):
-        """Parses an integer from the Bencoded data."""
-        self._consume(1)  # skip 'i'
-
-        end_pos = self.data.index(b'e', self.i)
-        number_bytes = self.data[self.i:end_pos]
+        """
+        Main decode entry point. Decodes the entire Bencoded data.
+
+        Runs as a flat loop over the input with an explicit stack of open
+        containers, so nesting costs no Python call frames.
+        """
+        data = self.data
+        end = len(data)
+        i = self.i
+        raw = self.raw
+        list_wrapper = None if raw else BencodeList
+        dict_wrapper = None if raw else BencodeDict
+
+        # Each frame is [container, wrapper, append, pending_key, value_start]
+        # for an open list/dict. wrapper is None in raw mode; append is the
+        # list's bound append (None for dicts); pending_key is _NO_KEY for
+        # lists and between dict entries.
+        stack = []
+        push = stack.append
+        pop = stack.pop
 
         try:
-            num = int(number_bytes)
-        except ValueError as exc:
-            raise BencodeDecodeError("Invalid integer format") from exc
-
-        self.i = end_pos + 1  # skip 'e'
-        return BencodeInt(num)
-
-    def _parse_string(self):
-        """Parses a byte string from the Bencoded data."""
-        # read length until ':'
-        colon = self.data.index(b':', self.i)
-        length_bytes = self.data[self.i:colon]
-
-        try:
-            length = int(length_bytes)
-        except ValueError as exc:
-            raise BencodeDecodeError("Invalid string length") from exc
-
-        self.i = colon + 1
-        string_bytes = self._consume(length)
-
-        return BencodeString(string_bytes)
-
-    def _parse_list(self):
-        """Parses a list from the Bencoded data."""
-        self._consume(1)  # skip 'l'
-        items = []
-
-        while self._peek() != b'e':
-            items.append(self._parse_value())
-
-        self._consume(1)  # skip 'e'
-        return BencodeList(items)
-
-    def _parse_dict(self):
-        """Parses a dictionary from the Bencoded data."""
-        self._consume(1)  # skip 'd'
-        obj = {}
-
-        while self._peek() != b'e':
-            # keys MUST be strings
-            key = self._parse_string().value
-            value = self._parse_value()
-            obj[key] = value
-
-        self._consume(1)  # skip 'e'
-        return BencodeDict(obj)
-
-
-def decode(data: bytes):
+            while True:
+                kind = _TOKEN_KIND[data[i]]
+
+                if kind == _T_STRING:
+                    # Length prefix: accumulate the digit run up to ':' by hand
+                    length = 0
+                    ch = data[i]
+                    while ch != _COLON:
+                        digit = ch - _ZERO
+                        if not 0 <= digit <= 9:
+                            raise BencodeDecodeError("Invalid string length")
+                        length = length * 10 + digit
+                        i += 1
+                        ch = data[i]
+                    i += 1  # skip ':'
+                    if i + length > end:
+                        raise BencodeDecodeError("Unexpected end of input")
+                    key_bytes = data[i:i + length]
+                    value = key_bytes if raw else BencodeString(key_bytes)
+                    i += length
+
+                elif kind == _T_INT:
+                    i += 1  # skip 'i'
+                    sign = 1
+                    if data[i] == _MINUS:
+                        sign = -1
+                        i += 1
+                    digits_start = i
+                    num = 0
+                    ch = data[i]
+                    while ch != _END_BYTE:
+                        digit = ch - _ZERO
+                        if not 0 <= digit <= 9:
+                            raise BencodeDecodeError("Invalid integer format")
+                        num = num * 10 + digit
+                        i += 1
+                        ch = data[i]
+                    if i == digits_start:
+                        raise BencodeDecodeError("Invalid integer format")
+                    value = sign * num if raw else BencodeInt(sign * num)
+                    key_bytes = None
+                    i += 1  # skip 'e'
+
+                elif kind == _T_LIST:
+                    items = []
+                    push([items, list_wrapper, items.append, _NO_KEY, i])
+                    i += 1
+                    continue
+
+                elif kind == _T_DICT:
+                    push([{}, dict_wrapper, None, _NO_KEY, i])
+                    i += 1
+                    continue
+
+                elif kind == _T_END and stack:
+                    container, wrapper, _, pending_key, _ = pop()
+                    if pending_key is not _NO_KEY:
+                        raise BencodeDecodeError(f"Missing value for key {pending_key!r}")
+                    value = container if wrapper is None else wrapper(container)
+                    key_bytes = None
+                    i += 1  # skip 'e'
+
+                else:
+                    raise BencodeDecodeError(f"Invalid token at index {i}: {data[i:i + 1]}")
+
+                # Attach the finished value to its parent container
+                if not stack:
+                    self.i = i
+                    return value
+
+                frame = stack[-1]
+                append = frame[2]
+                if append is not None:
+                    append(value)
+                elif frame[3] is _NO_KEY:
+                    # keys MUST be strings
+                    if key_bytes is None:
+                        raise BencodeDecodeError(f"Dictionary key must be a string at index {i}")
+                    frame[3] = key_bytes
+                    frame[4] = i
+                else:
+                    key = frame[3]
+                    frame[0][key] = value
+                    frame[3] = _NO_KEY
+                    if key == b"info" and len(stack) == 1:
+                        self.info_span = (frame[4], i)
+
+        except IndexError:
+            raise BencodeDecodeError("Unexpected end of input") from None
+
+def decode(data: bytes, raw: bool = False):
     """
     Convenience function to decode Bencoded data.
+    Pass raw=True to get native Python types instead of Bencode* wrappers.
     """
-    return BencodeDecoder(data).decode()
+    return BencodeDecoder(data, raw=raw).decode()
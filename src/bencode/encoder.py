@@ -1,32 +1,49 @@
 """
 Bencode encoder for BitTorrent metainfo and tracker responses.
 """
+from operator import itemgetter
+
 from .structure import BencodeDict, BencodeInt, BencodeList, BencodeString
 
+_item_key = itemgetter(0)
+
 
 def encode(obj) -> bytes:
     """Encodes a Python object or BencodeType into bencoded bytes."""
+    out = bytearray()
+    _encode_into(obj, out)
+    return bytes(out)
+
+
+def _encode_into(obj, out: bytearray):
+    """Appends the bencoding of obj to out. All encoders write through here."""
 
     if isinstance(obj, (int, BencodeInt)):
         value = obj if isinstance(obj, int) else obj.value
-        return encode_int(value)
-    
+        _encode_int_into(value, out)
+        return
+
     if isinstance(obj, (str, BencodeString)):
         if isinstance(obj, str):
-            return encode_str(obj)
+            _encode_bytes_into(obj.encode(), out)
+            return
         # BencodeString wraps bytes
-        return encode_bytes(obj.value)
-    
+        _encode_bytes_into(obj.value, out)
+        return
+
     if isinstance(obj, bytes):
-        return encode_bytes(obj)
+        _encode_bytes_into(obj, out)
+        return
 
     if isinstance(obj, (list, BencodeList)):
         value = obj if isinstance(obj, list) else obj.value
-        return encode_list(value)
+        _encode_list_into(value, out)
+        return
 
     if isinstance(obj, (dict, BencodeDict)):
         value = obj if isinstance(obj, dict) else obj.value
-        return encode_dict(value)
+        _encode_dict_into(value, out)
+        return
 
     raise TypeError(f"Cannot bencode object of type {type(obj)}")
 
@@ -35,6 +52,39 @@ def encode(obj) -> bytes:
 #   Encoding primitives
 # ------------------------------------------------------------
 
+def _encode_int_into(n: int, out: bytearray):
+    out += b"i"
+    out += str(n).encode()
+    out += b"e"
+
+
+def _encode_bytes_into(b: bytes, out: bytearray):
+    out += str(len(b)).encode()
+    out += b":"
+    out += b
+
+
+def _encode_list_into(lst: list, out: bytearray):
+    out += b"l"
+    for x in lst:
+        _encode_into(x, out)
+    out += b"e"
+
+
+def _encode_dict_into(d: dict, out: bytearray):
+    out += b"d"
+
+    # Encode each key once, then sort on the raw bytes (bencode key order)
+    items = [(k if isinstance(k, bytes) else k.encode(), v) for k, v in d.items()]
+    items.sort(key=_item_key)
+
+    for key_bytes, value in items:
+        _encode_bytes_into(key_bytes, out)
+        _encode_into(value, out)
+
+    out += b"e"
+
+
 def encode_int(n: int) -> bytes:
     """Encodes an integer to bencoded bytes (e.g., i123e)."""
     return f"i{n}e".encode()
@@ -42,7 +92,9 @@ def encode_int(n: int) -> bytes:
 
 def encode_bytes(b: bytes) -> bytes:
     """Encodes bytes to bencoded bytes (e.g., 4:spam)."""
-    return str(len(b)).encode() + b":" + b
+    out = bytearray()
+    _encode_bytes_into(b, out)
+    return bytes(out)
 
 
 def encode_str(s: str) -> bytes:
@@ -53,20 +105,13 @@ def encode_str(s: str) -> bytes:
 
 def encode_list(lst: list) -> bytes:
     """Encodes a list to bencoded bytes (e.g., l4:spame)."""
-    encoded_items = b''.join(encode(x) for x in lst)
-    return b"l" + encoded_items + b"e"
+    out = bytearray()
+    _encode_list_into(lst, out)
+    return bytes(out)
 
 
 def encode_dict(d: dict) -> bytes:
     """Encodes a dictionary to bencoded bytes (e.g., d3:cow3:moo4:spam4:eggse)."""
-    result = b"d"
-
-    def key_to_bytes(k):
-        return k if isinstance(k, bytes) else k.encode()
-
-    for key in sorted(d.keys(), key=key_to_bytes):
-        key_bytes = key_to_bytes(key)
-        result += encode_bytes(key_bytes)
-        result += encode(d[key])
-
-    return result + b"e"
+    out = bytearray()
+    _encode_dict_into(d, out)
+    return bytes(out)
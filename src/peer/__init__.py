@@ -1,7 +1,6 @@
 """
 Peer package for managing peer connections, protocol, and request pipeline.
 """
-from pieces.piece_manager import PieceManager
 from .message_types import MessageID
 from .peer_connection import PeerConnection
 from .peer_protocol import *
@@ -15,5 +14,4 @@ __all__ = [
     "build_message",
     "parse_message",
     "RequestPipeline",
-    "PieceManager",
 ]
\ No newline at end of file
@@ -1,11 +1,19 @@
 import asyncio
+import heapq
+import logging
 import random
+import time
+from operator import itemgetter
 from typing import List
 
 from .message_types import MessageID
 from .peer_connection import PeerConnection
 from .peer_scorer import PeerScorer
 
+logger = logging.getLogger(__name__)
+
+_score_key = itemgetter(0)
+
 
 class ChokeManager:
     """
@@ -16,12 +24,14 @@ class ChokeManager:
     MIN_UPLOAD_PER_SLOT = 20 * 1024 # 20 KB/s target per peer
     MAX_SLOTS = 10 
     UPLOAD_MARGIN = 50 * 1024 # 50 KB/s safety margin above download speed
+    THREADED_SCORING_MIN_PEERS = 200 # Score on a worker thread from this many candidates
 
     def __init__(self, unchoke_slots=4):
         self.unchoke_slots = unchoke_slots
         self.optimistic_unchoke_peer = None
         self.optimistic_round_counter = 0
         self.scorer = PeerScorer()
+        self._last_unchoke_set = frozenset()  # Peers unchoked by the previous round
 
     async def run_loop(self, peers_provider):
         """
@@ -32,23 +42,43 @@ class ChokeManager:
             await asyncio.sleep(10)
             await self._recalculate(peers_provider())
 
+    def _select_top_peers(self, candidate_peers, candidate_rates, slots):
+        """Scores the candidates, records the winners and returns the top `slots` peers."""
+        # Score Peers (Reputation-Based Tit-for-Tat)
+        scores = self.scorer.score_batch(candidate_peers, candidate_rates)
+        peers_with_score = zip(scores, candidate_peers)
+
+        # Select Top Peers to Unchoke (partial selection, no full sort)
+        top = heapq.nlargest(slots, peers_with_score, key=_score_key)
+        top_peers = [p for _, p in top]
+
+        self.scorer.record_wins(top_peers)
+        return top_peers
+
     async def _recalculate(self, peers: List[PeerConnection]):
-        # Gather Stats from ALL peers (to calculate global rates)
-        peer_data = [] # List of (peer, d_bytes, u_bytes, duration)
-        total_upload = 0
+        # Gather Stats from ALL peers (to calculate global rates) in one pass.
+        # Unchoke candidates are kept as parallel lists (peer, rate) instead
+        # of per-peer tuples that are filtered again afterwards.
         total_download = 0
-        total_duration = 0
-        
+        first_duration = None
+        candidate_peers = []
+        candidate_rates = []
+
+        now = time.monotonic()  # One clock read for a consistent snapshot
         for p in peers:
-            d_bytes, u_bytes, duration = p.reset_stats()
-            peer_data.append((p, d_bytes, u_bytes, duration))
-            total_upload += u_bytes
+            d_bytes, u_bytes, duration = p.reset_stats(now)
             total_download += d_bytes
-            total_duration += duration
-            
+            if first_duration is None:
+                first_duration = duration
+
+            # Only peers interested in our data are considered for unchoking.
+            if p.peer_interested and not p.closed:
+                candidate_peers.append(p)
+                candidate_rates.append(d_bytes / duration if duration > 0 else 0)
+
         avg_duration = 10.0
-        if peer_data and peer_data[0][3] > 0:
-            avg_duration = peer_data[0][3]
+        if first_duration is not None and first_duration > 0:
+            avg_duration = first_duration
 
         global_download_rate = total_download / avg_duration if avg_duration > 0 else 0
         
@@ -59,58 +89,76 @@ class ChokeManager:
         current_slots = max(2, calculated_slots)
         current_slots = min(current_slots, self.MAX_SLOTS)
             
-        print(f"[ChokeManager] DL: {global_download_rate/1024:.1f} KB/s + Margin -> Slots: {current_slots}")
+        if logger.isEnabledFor(logging.INFO):
+            logger.info(
+                "[ChokeManager] DL: %.1f KB/s + Margin -> Slots: %d",
+                global_download_rate / 1024, current_slots,
+            )
 
-        # Only peers interested in our data are considered for unchoking.
-        interested_peers_data = [
-            (p, d, u, t) for (p, d, u, t) in peer_data 
-            if p.peer_interested and not p.closed
-        ]
-        
-        if not interested_peers_data:
+        if not candidate_peers:
             return
 
-        # Score Peers (Reputation-Based Tit-for-Tat)
-        peers_with_score = []
-        for p, d_bytes, u_bytes, duration in interested_peers_data:
-            rate = d_bytes / duration if duration > 0 else 0
-            score = self.scorer.score_peer(p, rate)
-            peers_with_score.append((score, p))
-        
-        peers_with_score.sort(key=lambda x: x[0], reverse=True)
-        sorted_peers = [p for _, p in peers_with_score]
-
-        # Select Top Peers to Unchoke
-        top_peers = sorted_peers[:current_slots]
+        # Score and select. Large swarms are scored on a worker thread so
+        # the event loop keeps servicing sockets in the meantime; the scorer
+        # is only touched here and rounds never overlap.
+        if len(candidate_peers) >= self.THREADED_SCORING_MIN_PEERS:
+            top_peers = await asyncio.to_thread(
+                self._select_top_peers, candidate_peers, candidate_rates, current_slots
+            )
+        else:
+            top_peers = self._select_top_peers(candidate_peers, candidate_rates, current_slots)
         unchoke_set = set(top_peers)
 
-        for p in top_peers:
-            self.scorer.record_win(p)
-
         # Handle Optimistic Unchoke (Every 3rd round)
         self.optimistic_round_counter += 1
         if self.optimistic_round_counter >= 3:
             self.optimistic_round_counter = 0
-            candidates = [p for _, p in peers_with_score if p not in unchoke_set]
-            if candidates:
-                self.optimistic_unchoke_peer = random.choice(candidates)
-            else:
-                self.optimistic_unchoke_peer = None
+            # Reservoir sample one peer outside the unchoke set, without
+            # building a candidate list.
+            chosen = None
+            seen = 0
+            for p in candidate_peers:
+                if p in unchoke_set:
+                    continue
+                seen += 1
+                if random.randrange(seen) == 0:
+                    chosen = p
+            self.optimistic_unchoke_peer = chosen
 
-        if self.optimistic_unchoke_peer and self.optimistic_unchoke_peer.peer_interested:
-             unchoke_set.add(self.optimistic_unchoke_peer)
+        # Keep the optimistic peer only while it is still an unchoke candidate
+        # (interested and open); checked on the peer itself, not by list scan.
+        optimistic = self.optimistic_unchoke_peer
+        if optimistic is not None and optimistic.peer_interested and not optimistic.closed:
+            unchoke_set.add(optimistic)
 
-        # Apply Choke/Unchoke Decisions
-        for p in peers:
+        # Steady state: the same peers won again, so every peer is already
+        # in its desired state and no messages need to go out.
+        unchoke_set = frozenset(unchoke_set)
+        previous = self._last_unchoke_set
+        if unchoke_set == previous:
+            return
+        self._last_unchoke_set = unchoke_set
+
+        # Apply Choke/Unchoke Decisions. Only peers entering or leaving the
+        # unchoke set can need a message, so walk that difference, not all peers.
+        transitions = []
+        for p in unchoke_set ^ previous:
             if p.closed: continue
-            
-            should_unchoke = p in unchoke_set
-            
-            if should_unchoke:
-                if p.am_choking:
-                    print(f"[ChokeManager] Unchoking {p.ip}")
-                    await p.send(MessageID.UNCHOKE)
+
+            # A peer needs a message only when its desired state
+            # (unchoked) disagrees with its current one (not choking).
+            if (p in unchoke_set) != p.am_choking:
+                continue
+
+            if p.am_choking:
+                logger.debug("[ChokeManager] Unchoking %s", p.ip)
+                transitions.append(p.send(MessageID.UNCHOKE))
             else:
-                if not p.am_choking:
-                    print(f"[ChokeManager] Choking {p.ip}")
-                    await p.send(MessageID.CHOKE)
\ No newline at end of file
+                logger.debug("[ChokeManager] Choking %s", p.ip)
+                transitions.append(p.send(MessageID.CHOKE))
+
+        # Each send writes its frame immediately, so running them together
+        # overlaps the drains instead of waiting on one peer at a time.
+        # A failing peer marks itself closed and must not abort the rest.
+        if transitions:
+            await asyncio.gather(*transitions, return_exceptions=True)
@@ -1,9 +1,52 @@
 import asyncio
-import struct
+import socket
 import time
-
-from .message_types import MessageID
-from .peer_protocol import build_handshake, parse_handshake, build_message, HANDSHAKE_LEN
+from bisect import insort
+from itertools import compress
+
+from .message_types import MessageID, BLOCK_LEN
+from .peer_protocol import (
+    build_handshake, parse_handshake, build_message, build_requests,
+    CONTROL_FRAMES, HANDSHAKE_LEN,
+)
+
+# Each bitfield byte expanded to eight 0/1 flag bytes, MSB first.
+_BYTE_FLAGS = tuple(
+    bytes((byte >> (7 - bit)) & 1 for bit in range(8))
+    for byte in range(256)
+)
+
+# Kernel socket buffer size requested for peer connections
+SOCKET_BUFFER_SIZE = 1 << 20
+# StreamReader buffer limit. The transport pauses reading once twice this
+# much is buffered; a roomy limit lets each recv() pull many PIECE frames.
+STREAM_READ_LIMIT = 256 * 1024
+# drain() only blocks once this much data is waiting in the transport
+WRITE_BUFFER_HIGH_WATER = 64 * 1024
+
+# Applied independently after connect, so one unsupported option does not
+# skip the others.
+_SOCKET_OPTIONS = (
+    (socket.IPPROTO_TCP, socket.TCP_NODELAY, 1),
+    (socket.SOL_SOCKET, socket.SO_RCVBUF, SOCKET_BUFFER_SIZE),
+    (socket.SOL_SOCKET, socket.SO_SNDBUF, SOCKET_BUFFER_SIZE),
+)
+
+_ID_CHOKE = MessageID.CHOKE.value
+_ID_UNCHOKE = MessageID.UNCHOKE.value
+_ID_INTERESTED = MessageID.INTERESTED.value
+_ID_NOT_INTERESTED = MessageID.NOT_INTERESTED.value
+_ID_HAVE = MessageID.HAVE.value
+_ID_BITFIELD = MessageID.BITFIELD.value
+_ID_PIECE = MessageID.PIECE.value
+
+# Remote choke/interest messages -> (attribute, new value)
+_PEER_STATE_UPDATES = {
+    _ID_CHOKE: ("peer_choking", True),
+    _ID_UNCHOKE: ("peer_choking", False),
+    _ID_INTERESTED: ("peer_interested", True),
+    _ID_NOT_INTERESTED: ("peer_interested", False),
+}
 
 
 class PeerConnection:
@@ -14,19 +57,30 @@ class PeerConnection:
     def __init__(self, ip, port, torrent_meta, peer_id):
         self.reader = None
         self.writer = None
+        # Bound stream methods, cached by attach() for the per-message paths
+        self._readexactly = None
+        self._write = None
+        self._drain = None
+        self._out = []  # Frames queued by send_requests() until the next flush
         self.ip = ip
         self.port = port
         self.meta = torrent_meta
         self.peer_id = peer_id
         self.remote_peer_id = None
         self.closed = False
+        # Optional swarm-wide availability counter (e.g. PieceManager) told
+        # about pieces this peer gains and loses: peer_has_pieces/peer_lost_pieces
+        self.piece_tracker = None
 
         self.bitfield = None
-        self.have = set()
+        # One 0/1 byte per piece: the single record of what the peer has,
+        # set by BITFIELD and HAVE alike.
+        self._piece_flags = bytearray(torrent_meta.num_pieces)
+        self._available = None  # Sorted available_pieces(); rebuilt per BITFIELD, extended by HAVE
         
         self.downloaded_sample = 0
         self.uploaded_sample = 0
-        self.last_reset_time = time.time()
+        self.last_reset_time = time.monotonic()
         
         self.am_choking = True
         self.am_interested = False
@@ -36,8 +90,8 @@ class PeerConnection:
     async def connect(self):
         connect_timeout_seconds = 5
         try:
-            self.reader, self.writer = await asyncio.wait_for(
-                asyncio.open_connection(self.ip, self.port),
+            reader, writer = await asyncio.wait_for(
+                asyncio.open_connection(self.ip, self.port, limit=STREAM_READ_LIMIT),
                 timeout=connect_timeout_seconds,
             )
         except asyncio.TimeoutError:
@@ -51,14 +105,18 @@ class PeerConnection:
                 ) from e
             raise ConnectionError(f"Could not connect to peer {self.ip}:{self.port} -> {e}") from e
 
+        self.attach(reader, writer)
+        self._tune_socket()
+        writer.transport.set_write_buffer_limits(high=WRITE_BUFFER_HIGH_WATER)
+
         handshake = build_handshake(self.meta.info_hash, self.peer_id)
-        self.writer.write(handshake)
-        await self.writer.drain()
+        self._write(handshake)
+        await self._drain()
 
         try:
             handshake_timeout_seconds = 5
             resp = await asyncio.wait_for(
-                self.reader.readexactly(HANDSHAKE_LEN),
+                self._readexactly(HANDSHAKE_LEN),
                 timeout=handshake_timeout_seconds,
             )
         except asyncio.TimeoutError:
@@ -74,12 +132,39 @@ class PeerConnection:
 
         return remote_pid
     
-    def reset_stats(self):
+    def attach(self, reader, writer):
+        """Adopt an open stream pair and bind its hot-path methods once."""
+        self.reader = reader
+        self.writer = writer
+        self._readexactly = reader.readexactly
+        if writer is not None:
+            self._write = writer.write
+            self._drain = writer.drain
+
+    def _tune_socket(self):
+        """
+        Disable Nagle so small control messages (CHOKE, REQUEST, ...) go out
+        immediately, and ask for larger kernel buffers for PIECE traffic.
+        """
+        sock = self.writer.get_extra_info("socket")
+        # TCP_NODELAY only exists for TCP over IPv4/IPv6
+        if sock is None or sock.family not in (socket.AF_INET, socket.AF_INET6):
+            return
+
+        for level, option, value in _SOCKET_OPTIONS:
+            try:
+                sock.setsockopt(level, option, value)
+            except OSError:
+                pass # Tuning is best-effort; the connection works without it
+
+    def reset_stats(self, now=None):
         """
         Returns (bytes_downloaded, bytes_uploaded, duration_seconds) since last call.
-        Resets counters and timer.
+        Resets counters and timer. Pass a shared time.monotonic() reading as
+        `now` to snapshot many peers against the same clock.
         """
-        now = time.time()
+        if now is None:
+            now = time.monotonic()
         duration = now - self.last_reset_time
         
         d_val = self.downloaded_sample
@@ -101,10 +186,21 @@ class PeerConnection:
             return
 
         try:
-            msg = build_message(msg_id, payload)
-            self.writer.write(msg)
+            msg = CONTROL_FRAMES.get(msg_id) if not payload else None
+            # A 5-byte control frame cannot build up backpressure, so it is
+            # written without a drain() (and without yielding to the loop).
+            if msg is not None:
+                drain = False
+            else:
+                msg = build_message(msg_id, payload)
+            if self._out:
+                # Keep wire order: queued requests go out ahead of this frame
+                self._out.append(msg)
+                msg = b"".join(self._out)
+                self._out.clear()
+            self._write(msg)
             if drain:
-                await self.writer.drain()
+                await self._drain()
             
             if msg_id == MessageID.PIECE:
                 # payload contains (index + begin + block_data). We count the block_data size.
@@ -120,7 +216,43 @@ class PeerConnection:
                 self.am_interested = False
                 
         except Exception:
-            self.closed = True
+            self._mark_closed()
+            raise
+
+    def send_requests(self, index, begin, end):
+        """
+        Queue REQUESTs for every block of piece index in [begin, end),
+        framed into a single buffer. Queued requests are written together
+        by the next flush() (or ahead of the next send()).
+        """
+        if self.closed or begin >= end:
+            return
+
+        self._out.append(build_requests(index, begin, end, BLOCK_LEN))
+
+    async def flush(self):
+        """Write all queued frames in a single call, then drain."""
+        if self.closed or not self._out:
+            return
+
+        data = b"".join(self._out)
+        self._out.clear()
+        try:
+            self._write(data)
+            await self._drain()
+        except Exception:
+            self._mark_closed()
+            raise
+
+    async def drain(self):
+        """Wait until the write buffer is back under its high-water mark."""
+        if self.closed:
+            return
+
+        try:
+            await self._drain()
+        except Exception:
+            self._mark_closed()
             raise
 
     async def read_message(self):
@@ -128,79 +260,125 @@ class PeerConnection:
 
         Returns:
             tuple: (msg_id, payload) or (None, None) on connection close/error.
+            payload is a memoryview over the received frame. Each frame is
+            its own buffer, so the view stays valid after later reads
+            (self.bitfield keeps one); PIECE blocks are copied once more,
+            straight into the piece buffer.
             'keepalive' is returned as msg_id for keep-alive messages.
         """
         try:
-            header = await self.reader.readexactly(4)
+            header = await self._readexactly(4)
         except asyncio.IncompleteReadError:
-            self.closed = True
+            self._mark_closed()
             return None, None
 
-        length = struct.unpack(">I", header)[0]
+        length = int.from_bytes(header, "big")
 
         if length == 0:
             return "keepalive", None
 
         try:
-            msg_id = (await self.reader.readexactly(1))[0]
-            payload = await self.reader.readexactly(length - 1)
-            
-            self.downloaded_sample += (length - 1)
-            
+            # One read for id + payload; the payload is a view into that
+            # frame, so PIECE blocks are not copied a second time.
+            frame = await self._readexactly(length)
         except asyncio.IncompleteReadError:
-            self.closed = True
+            self._mark_closed()
             return None, None
 
-        if msg_id == int(MessageID.CHOKE):
-            self.peer_choking = True
-        elif msg_id == int(MessageID.UNCHOKE):
-            self.peer_choking = False
-        elif msg_id == int(MessageID.INTERESTED):
-            self.peer_interested = True
-        elif msg_id == int(MessageID.NOT_INTERESTED):
-            self.peer_interested = False
+        self.downloaded_sample += (length - 1)
+        msg_id = frame[0]
+        payload = memoryview(frame)[1:]
 
-        if msg_id == int(MessageID.BITFIELD):
+        # PIECE is nearly every frame during a download and changes no
+        # connection state, so return it before the control-message checks.
+        if msg_id == _ID_PIECE:
+            return msg_id, payload
+
+        state = _PEER_STATE_UPDATES.get(msg_id)
+        if state is not None:
+            setattr(self, *state)
+            return msg_id, payload
+
+        if msg_id == _ID_BITFIELD:
+            old = self._piece_flags
             self.bitfield = payload
+            self._piece_flags = flags = self._decode_bitfield(payload)
+            self._available = None
+            if self.piece_tracker is not None:
+                # The merge only adds pieces, so XOR-ing old and new flags
+                # (as integers, word-wide) leaves exactly the gained ones.
+                gained = int.from_bytes(flags, "little") ^ int.from_bytes(old, "little")
+                if gained:
+                    num_pieces = len(flags)
+                    self.piece_tracker.peer_has_pieces(
+                        compress(range(num_pieces), gained.to_bytes(num_pieces, "little"))
+                    )
             return msg_id, payload
 
-        if msg_id == int(MessageID.HAVE):
+        if msg_id == _ID_HAVE:
             if len(payload) >= 4:
                 piece_index = int.from_bytes(payload[:4], "big")
-                self.have.add(piece_index)
+                flags = self._piece_flags
+                # Out-of-range indices are ignored; known pieces change nothing
+                if piece_index < len(flags) and not flags[piece_index]:
+                    flags[piece_index] = 1
+                    if self._available is not None:
+                        insort(self._available, piece_index)
+                    if self.piece_tracker is not None:
+                        self.piece_tracker.peer_has_pieces((piece_index,))
             else:
                 pass # Malformed HAVE message
             return msg_id, payload
 
         return msg_id, payload
 
-    def has_piece(self, idx: int) -> bool:
-        """Return True if the peer appears to have piece idx.
+    def _mark_closed(self):
+        """
+        Flag the connection closed and withdraw its pieces from the tracker.
+        The tracker is detached too: frames still buffered in the reader
+        must not re-announce pieces nothing would withdraw again.
+        """
+        if self.closed:
+            return
+        self.closed = True
+        tracker, self.piece_tracker = self.piece_tracker, None
+        if tracker is not None:
+            tracker.peer_lost_pieces(self.available_pieces())
 
-        Checks explicit HAVE messages and bitfield (if present).
+    def _decode_bitfield(self, payload) -> bytearray:
+        """
+        Expand a BITFIELD payload into one flag byte per piece, keeping the
+        pieces already announced by HAVE.
         """
-        if idx in self.have:
-            return True
+        num_pieces = self.meta.num_pieces
+        flags = b"".join(map(_BYTE_FLAGS.__getitem__, payload))[:num_pieces]
+        flags = flags.ljust(num_pieces, b"\x00")  # Short bitfield: rest unknown
+        # Flag bytes are 0/1, so OR-ing them as integers merges the two sets
+        merged = int.from_bytes(flags, "little") | int.from_bytes(self._piece_flags, "little")
+        return bytearray(merged.to_bytes(num_pieces, "little"))
 
-        if self.bitfield:
-            byte_index = idx // 8
-            if byte_index < len(self.bitfield):
-                bit_in_byte = 7 - (idx % 8)
-                return ((self.bitfield[byte_index] >> bit_in_byte) & 1) == 1
+    def has_piece(self, idx: int) -> bool:
+        """Return True if the peer has announced piece idx (BITFIELD or HAVE)."""
+        flags = self._piece_flags
+        return 0 <= idx < len(flags) and flags[idx] == 1
 
-        return False
+    def piece_flags(self):
+        """
+        One 0/1 byte per piece, BITFIELD and HAVEs together.
+        Shared with the connection; callers must not modify it.
+        """
+        return self._piece_flags
 
     def available_pieces(self):
-        """Return an iterable of piece indices this peer claims to have."""
-        if self.bitfield:
-            bits = []
-            total_pieces = self.meta.num_pieces
-            for idx in range(total_pieces):
-                if self.has_piece(idx):
-                    bits.append(idx)
-            return bits
-
-        return sorted(self.have)
+        """
+        Return the sorted piece indices this peer claims to have. The list is
+        cached on the connection; callers must not modify it.
+        """
+        if self._available is None:
+            # compress() picks the set flags in index order, in C
+            flags = self._piece_flags
+            self._available = list(compress(range(len(flags)), flags))
+        return self._available
 
     def close(self):
         if self.closed or self.writer is None:
@@ -214,4 +392,4 @@ class PeerConnection:
         except RuntimeError:
             pass # No running loop (close called outside async context)
 
-        self.closed = True
\ No newline at end of file
+        self._mark_closed()
\ No newline at end of file
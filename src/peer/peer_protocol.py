@@ -9,6 +9,23 @@ from .message_types import MessageID
 PROTOCOL_STR = b"BitTorrent protocol"
 HANDSHAKE_LEN = 1 + len(PROTOCOL_STR) + 8 + 20 + 20
 
+# 4-byte big-endian length prefix (+ message id), compiled once
+_LEN = struct.Struct(">I")
+_HEADER = struct.Struct(">IB")
+# pstrlen, pstr, reserved, info_hash, peer_id
+_HANDSHAKE = struct.Struct(f">B{len(PROTOCOL_STR)}s8s20s20s")
+
+# Payload-less control messages are fixed 5-byte frames; build them once.
+CONTROL_FRAMES = {
+    msg_id: struct.pack(">IB", 1, msg_id)
+    for msg_id in (
+        MessageID.CHOKE,
+        MessageID.UNCHOKE,
+        MessageID.INTERESTED,
+        MessageID.NOT_INTERESTED,
+    )
+}
+
 def build_handshake(info_hash: bytes, peer_id: bytes) -> bytes:
     """
     Build a handshake message.
@@ -18,13 +35,7 @@ def build_handshake(info_hash: bytes, peer_id: bytes) -> bytes:
     if len(info_hash) != 20 or len(peer_id) != 20:
         raise ValueError("info_hash and peer_id must be 20 bytes each")
 
-    return (
-        bytes([len(PROTOCOL_STR)]) +
-        PROTOCOL_STR +
-        b"\x00" * 8 +
-        info_hash +
-        peer_id
-    )
+    return _HANDSHAKE.pack(len(PROTOCOL_STR), PROTOCOL_STR, bytes(8), info_hash, peer_id)
 
 def parse_handshake(data: bytes) -> Tuple[bytes, bytes]:
     """
@@ -34,28 +45,39 @@ def parse_handshake(data: bytes) -> Tuple[bytes, bytes]:
     if len(data) < HANDSHAKE_LEN:
         raise ValueError("Handshake too short")
 
-    pstrlen = data[0]
-    pstr = data[1:1+pstrlen]
-    if pstr != PROTOCOL_STR:
-        raise ValueError(f"Invalid protocol string: {pstr!r}")
-
-    offset = 1 + pstrlen
-    offset += 8
-    info_hash = data[offset: offset + 20]
-    offset += 20
-    peer_id = data[offset: offset + 20]
-
-    if len(info_hash) != 20 or len(peer_id) != 20:
-        raise ValueError("Handshake fields malformed")
+    pstrlen, pstr, _reserved, info_hash, peer_id = _HANDSHAKE.unpack_from(data, 0)
+    if pstrlen != len(PROTOCOL_STR) or pstr != PROTOCOL_STR:
+        raise ValueError(f"Invalid protocol string: {bytes(data[1:1 + pstrlen])!r}")
 
     return info_hash, peer_id
 
-def build_message(msg_id: MessageID, payload: bytes = b"") -> bytes:
+def build_message(msg_id: MessageID, payload: bytes = b"") -> bytearray:
     """
     Frame a message with 4-byte big-endian length prefix + 1-byte ID + payload.
+    The frame is built in one preallocated buffer; writers accept it as-is.
     """
     length = 1 + len(payload)
-    return struct.pack(">I", length) + bytes([int(msg_id)]) + payload
+    out = bytearray(4 + length)
+    _HEADER.pack_into(out, 0, length, msg_id)
+    out[5:] = payload
+    return out
+
+# Fixed-shape messages packed with precompiled Structs (length, id, fields...)
+_REQUEST_STRUCT = struct.Struct(">IBIII")
+_ID_REQUEST = MessageID.REQUEST.value
+
+def build_requests(index: int, begin: int, end: int, block_len: int) -> bytearray:
+    """
+    Frame REQUESTs for every block of piece index in [begin, end), back to
+    back in one buffer. Blocks are block_len long; the last may be shorter.
+    """
+    offsets = range(begin, end, block_len)
+    frame_len = _REQUEST_STRUCT.size
+    buf = bytearray(frame_len * len(offsets))
+    pack_into = _REQUEST_STRUCT.pack_into
+    for pos, offset in zip(range(0, len(buf), frame_len), offsets):
+        pack_into(buf, pos, 13, _ID_REQUEST, index, offset, min(block_len, end - offset))
+    return buf
 
 def parse_message(stream_bytes: bytes) -> Optional[tuple]:
     """
@@ -65,7 +87,7 @@ def parse_message(stream_bytes: bytes) -> Optional[tuple]:
     if len(stream_bytes) < 4:
         return None
 
-    length = struct.unpack(">I", stream_bytes[:4])[0]
+    length = _LEN.unpack_from(stream_bytes, 0)[0]
     if length == 0:
         return "keep-alive", b"", 4
 
@@ -2,36 +2,62 @@
 Implements peer scoring logic for the ChokeManager.
 """
 import math
+from collections import deque
+from operator import mul
 
 
 class PeerStats:
     """Stores and calculates statistics for a single peer's performance."""
-    def __init__(self):
+    # One instance per peer, touched by every scoring round: fixed slots keep
+    # attribute access fast and the per-peer footprint small.
+    __slots__ = ("ewma_rate", "rate_history", "top_tier_count", "_sum", "_sum_sq", "_evicted")
+
+    def __init__(self, history_len=10):
         self.ewma_rate = 0.0
-        self.rate_history = []
+        self.rate_history = deque(maxlen=history_len) # Oldest sample drops out in O(1)
         self.top_tier_count = 0
+
+        # Running sum and sum of squares of rate_history, so the variance
+        # is O(1) per query. Re-summed exactly once per full window of
+        # evictions to keep floating-point drift from accumulating.
+        self._sum = 0.0
+        self._sum_sq = 0.0
+        self._evicted = 0
         
-    def add_sample(self, rate, alpha=0.2, history_len=10):
+    def add_sample(self, rate, alpha=0.2):
         # Update Exponential Weighted Moving Average (EWMA)
         if self.ewma_rate == 0:
             self.ewma_rate = rate
         else:
             self.ewma_rate = (alpha * rate) + ((1 - alpha) * self.ewma_rate)
             
-        self.rate_history.append(rate)
-        if len(self.rate_history) > history_len:
-            self.rate_history.pop(0)
+        history = self.rate_history
+        if len(history) == history.maxlen:
+            oldest = history[0]
+            self._sum -= oldest
+            self._sum_sq -= oldest * oldest
+            self._evicted += 1
+        history.append(rate)
+        self._sum += rate
+        self._sum_sq += rate * rate
+
+        if self._evicted >= history.maxlen:
+            self._sum = math.fsum(history)
+            self._sum_sq = math.fsum(map(mul, history, history))
+            self._evicted = 0
             
     def get_variance_penalty(self):
         """Calculates a penalty factor (0.0 to 1.0) based on rate stability."""
         if len(self.rate_history) < 2:
             return 1.0 # No penalty if insufficient history
             
-        mean = sum(self.rate_history) / len(self.rate_history)
-        if mean == 0: 
+        n = len(self.rate_history)
+        mean = self._sum / n
+        if mean <= 0: 
             return 1.0 # Avoid division by zero, no penalty if mean is zero
             
-        variance = sum((x - mean) ** 2 for x in self.rate_history) / len(self.rate_history)
+        # E[x^2] - mean^2 from the running sums (clamped against rounding)
+        variance = max(0.0, self._sum_sq / n - mean * mean)
         std_dev = math.sqrt(variance)
         
         # Coefficient of Variation (CV): A higher CV indicates greater instability.
@@ -55,15 +81,42 @@ class PeerScorer:
         st = self.get_stats(peer)
         st.top_tier_count += 1
 
+    def record_wins(self, peers):
+        """Increments 'top_tier_count' for every peer selected this round."""
+        stats = self.stats
+        for peer in peers:
+            st = stats.get(peer)
+            if st is None:
+                st = stats[peer] = PeerStats()
+            st.top_tier_count += 1
+
     def score_peer(self, peer, current_rate):
         """
         Calculates a comprehensive score for a peer based on current performance,
         historical consistency (EWMA & variance), and past reliability.
         """
         st = self.get_stats(peer)
-        
         st.add_sample(current_rate)
-        
+        return self._score_stats(st, current_rate)
+
+    def score_batch(self, peers, rates):
+        """
+        Scores every peer against its current rate in one pass.
+        Returns a list of scores aligned with peers.
+        """
+        stats = self.stats
+        score_stats = self._score_stats
+        scores = []
+        for peer, rate in zip(peers, rates):
+            st = stats.get(peer)
+            if st is None:
+                st = stats[peer] = PeerStats()
+            st.add_sample(rate)
+            scores.append(score_stats(st, rate))
+        return scores
+
+    @staticmethod
+    def _score_stats(st, current_rate):
         # Base Performance: Blend of current rate and smoothed historical average.
         base_performance = (0.7 * current_rate) + (0.3 * st.ewma_rate)
         
@@ -2,10 +2,17 @@
 Manages the request/response pipeline for a single peer connection.
 """
 import asyncio
-import struct
+import logging
+from struct import Struct
 
 from .message_types import MessageID, BLOCK_LEN
 
+logger = logging.getLogger(__name__)
+
+# Fixed payload prefixes, unpacked straight from the frame's memoryview
+_PIECE_HEADER = Struct(">II")        # index, begin
+_REQUEST_FIELDS = Struct(">III")     # index, begin, length
+
 
 class RequestPipeline:
     """
@@ -17,8 +24,29 @@ class RequestPipeline:
         self.pieces = piece_manager
         self.pipeline_depth = pipeline_depth
         self.block_timeout = block_timeout
+        # Outstanding read_message() call. It outlives wait rounds (and
+        # pieces), so a read is never cancelled halfway through a frame.
+        self._read_task = None
+        # Background drain() covering the PIECE replies written since it began
+        self._upload_drain = None
+
+    def _next_message(self):
+        """Return the pending read_message() task, starting one if needed."""
+        if self._read_task is None:
+            self._read_task = asyncio.create_task(self.peer.read_message())
+        return self._read_task
 
     async def start(self):
+        try:
+            await self._run()
+        finally:
+            if self._read_task is not None:
+                self._read_task.cancel()
+                self._read_task = None
+            if self._upload_drain is not None:
+                self._upload_drain.cancel()
+
+    async def _run(self):
         await self.peer.send(MessageID.INTERESTED)
 
         while True:
@@ -37,7 +65,7 @@ class RequestPipeline:
             if piece_index is None:
                 if self.pieces.all_pieces_done():
                     return
-                print("[Pipeline] No more pieces for this peer.")
+                logger.info("[Pipeline] No more pieces for this peer.")
                 return
 
             ok = await self.download_piece(piece_index)
@@ -54,101 +82,125 @@ class RequestPipeline:
         if len(payload) < 12:
             return
 
-        index = int.from_bytes(payload[0:4], "big")
-        begin = int.from_bytes(payload[4:8], "big")
-        length = int.from_bytes(payload[8:12], "big")
+        index, begin, length = _REQUEST_FIELDS.unpack_from(payload)
 
         if length > 32 * 1024: 
             return
 
         block = await self.pieces.read_block(index, begin, length)
         if block:
-            resp_payload = payload[0:8] + block
-            await self.peer.send(MessageID.PIECE, resp_payload)
+            resp_payload = bytes(payload[0:8]) + block
+            await self._send_block(resp_payload)
+
+    async def _send_block(self, payload):
+        """
+        Write a PIECE reply and drain it in the background, so the loop goes
+        on reading (and loading from disk) the next request meanwhile. The
+        next reply waits for that drain first, which keeps backpressure:
+        it only blocks while the write buffer is over its high-water mark.
+        """
+        previous = self._upload_drain
+        if previous is not None and not previous.done():
+            await asyncio.wait([previous])
+
+        await self.peer.send(MessageID.PIECE, payload, drain=False)
+        self._upload_drain = asyncio.create_task(self._drain_quietly())
+
+    async def _drain_quietly(self):
+        try:
+            await self.peer.drain()
+        except Exception:
+            pass # The peer marked itself closed; the read loop will notice
+
+    async def _fill_pipeline(self, idx, offset, length, in_flight):
+        """
+        Request blocks from offset on until pipeline_depth are in flight.
+        Returns the offset of the first block not yet requested and the
+        number of blocks requested now.
+        """
+        room = self.pipeline_depth - in_flight
+        if offset >= length or room <= 0:
+            return offset, 0
+
+        end = min(length, offset + room * BLOCK_LEN)
+        self.peer.send_requests(idx, offset, end)
+        await self.peer.flush()
+        return end, -(-(end - offset) // BLOCK_LEN)
 
     async def download_piece(self, idx):
         length = self.pieces.get_piece_length(idx)
-        offset = 0
-        pending = set()
-
-        requests_sent = 0
-        while offset < length and len(pending) < self.pipeline_depth:
-            blen = min(BLOCK_LEN, length - offset)
-            payload = struct.pack(">III", idx, offset, blen)
-            await self.peer.send(MessageID.REQUEST, payload, drain=False)
-            pending.add(offset)
-            offset += blen
-            requests_sent += 1
-            
-        if requests_sent > 0:
-            await self.peer.writer.drain()
+        offset, sent = await self._fill_pipeline(idx, 0, length, 0)
+        # Bit n set: block n was requested and has not arrived yet
+        pending_mask = (1 << sent) - 1
+        in_flight = sent
 
         piece_done_event = self.pieces.get_piece_event(idx)
+        # One waiter for the whole piece; the read task is only replaced
+        # once its message has been consumed.
+        event_task = asyncio.create_task(piece_done_event.wait())
+        try:
+            while not self.pieces.piece_complete(idx):
 
-        while not self.pieces.piece_complete(idx):
-
-            if self.pieces.all_pieces_done():
-                return True
-                
-            if piece_done_event.is_set():
-                return True
-
-            read_task = asyncio.create_task(self.peer.read_message())
-            event_task = asyncio.create_task(piece_done_event.wait())
-            
-            done, pending_tasks = await asyncio.wait(
-                [read_task, event_task],
-                return_when=asyncio.FIRST_COMPLETED,
-                timeout=self.block_timeout
-            )
-            
-            for t in pending_tasks:
-                t.cancel()
-                
-            if not done:
-                print(f"[Pipeline] Block timeout for piece {idx}")
-                return False
-                
-            if event_task in done:
-                return True
-                
-            try:
-                msg_id, payload = read_task.result()
-            except Exception:
-                return False
-
-            if msg_id is None:
-                print("[Pipeline] Peer closed connection.")
-                return False
-                
-            if msg_id == MessageID.REQUEST:
-                await self._handle_request(payload)
-                continue
-
-            if msg_id == MessageID.PIECE:
-                got_idx = int.from_bytes(payload[0:4], "big")
-                begin   = int.from_bytes(payload[4:8], "big")
-                block   = payload[8:]
-
-                if got_idx == idx:
-                    success = await self.pieces.store_block(idx, begin, block)
-                    if not success:
-                        return False
-
-                    if begin in pending:
-                        pending.remove(begin)
-
-                requests_sent = 0
-                while offset < length and len(pending) < self.pipeline_depth:
-                    blen = min(BLOCK_LEN, length - offset)
-                    payload = struct.pack(">III", idx, offset, blen)
-                    await self.peer.send(MessageID.REQUEST, payload, drain=False)
-                    pending.add(offset)
-                    offset += blen
-                    requests_sent += 1
+                if self.pieces.all_pieces_done():
+                    return True
+
+                # asyncio.wait's timeout only arms a timer: unlike wait_for it
+                # adds no wrapper task and never cancels the read on expiry.
+                read_task = self._next_message()
+                done, _ = await asyncio.wait(
+                    [read_task, event_task],
+                    return_when=asyncio.FIRST_COMPLETED,
+                    timeout=self.block_timeout
+                )
+
+                if not done:
+                    logger.warning("[Pipeline] Block timeout for piece %d", idx)
+                    return False
+
+                # Another peer finished the piece, or its data failed the hash
+                # check and the piece was put back up for reservation. A message
+                # that arrived at the same time stays in the read task for the
+                # next piece.
+                if event_task in done:
+                    return True
+
+                self._read_task = None
+                try:
+                    msg_id, payload = read_task.result()
+                except Exception:
+                    return False
+
+                if msg_id is None:
+                    logger.info("[Pipeline] Peer closed connection.")
+                    return False
                 
-                if requests_sent > 0:
-                    await self.peer.writer.drain()
-
-        print(f"[Pipeline] Completed piece {idx}")
-        return True
+                if msg_id == MessageID.REQUEST:
+                    await self._handle_request(payload)
+                    continue
+
+                if msg_id == MessageID.PIECE:
+                    if len(payload) < 8:
+                        continue # Malformed PIECE message
+                    got_idx, begin = _PIECE_HEADER.unpack_from(payload)
+                    block = memoryview(payload)[8:]  # No copy, whatever the payload type
+
+                    if got_idx == idx:
+                        success = await self.pieces.store_block(idx, begin, block)
+                        if not success:
+                            return False
+
+                        bit = 1 << (begin // BLOCK_LEN)
+                        if not begin % BLOCK_LEN and pending_mask & bit:
+                            pending_mask ^= bit
+                            in_flight -= 1
+
+                    next_offset, sent = await self._fill_pipeline(idx, offset, length, in_flight)
+                    if sent:
+                        pending_mask |= ((1 << sent) - 1) << (offset // BLOCK_LEN)
+                        in_flight += sent
+                        offset = next_offset
+
+            logger.debug("[Pipeline] Completed piece %d", idx)
+            return True
+        finally:
+            event_task.cancel()
@@ -0,0 +1,6 @@
+"""
+Pieces package for piece bookkeeping, verification and disk I/O.
+"""
+from .piece_manager import PieceManager
+
+__all__ = ["PieceManager"]
\ No newline at end of file
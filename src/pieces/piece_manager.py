@@ -1,10 +1,76 @@
 import asyncio
 import hashlib
+import logging
 import os
+import threading
+from array import array
+from bisect import bisect_right
+from concurrent.futures import ThreadPoolExecutor
+from itertools import compress
 from pathlib import Path
 
 from peer.message_types import BLOCK_LEN
 
+logger = logging.getLogger(__name__)
+
+# Pieces hashed per worker task during startup verification
+VERIFY_BATCH_SIZE = 64
+# Worker threads hashing and writing completed pieces during download
+HASH_WORKERS = 2
+# Idle full-length piece buffers kept for reuse
+PIECE_BUFFER_POOL_SIZE = 8
+
+
+def _sha1_digest(data) -> bytes:
+    return hashlib.sha1(data).digest()
+
+
+# Opened once per file; O_BINARY only exists (and matters) on Windows
+_FILE_OPEN_FLAGS = os.O_RDWR | os.O_CREAT | getattr(os, "O_BINARY", 0)
+
+if hasattr(os, "pwrite"):
+    def _pwrite_all(fd, data, offset):
+        """Write all of data at offset without moving the file position."""
+        view = memoryview(data)
+        while view:
+            written = os.pwrite(fd, view, offset)
+            view = view[written:]
+            offset += written
+
+    def _pread_upto(fd, count, offset):
+        """Read count bytes at offset (fewer only at end of file)."""
+        data = os.pread(fd, count, offset)
+        while len(data) < count:
+            more = os.pread(fd, count - len(data), offset + len(data))
+            if not more:
+                break
+            data += more
+        return data
+else:
+    # No positional I/O (Windows): seek + write/read under one lock, since
+    # the shared descriptors are used from several threads.
+    _seek_lock = threading.Lock()
+
+    def _pwrite_all(fd, data, offset):
+        """Write all of data at offset."""
+        view = memoryview(data)
+        with _seek_lock:
+            os.lseek(fd, offset, os.SEEK_SET)
+            while view:
+                view = view[os.write(fd, view):]
+
+    def _pread_upto(fd, count, offset):
+        """Read count bytes at offset (fewer only at end of file)."""
+        with _seek_lock:
+            os.lseek(fd, offset, os.SEEK_SET)
+            data = os.read(fd, count)
+            while len(data) < count:
+                more = os.read(fd, count - len(data))
+                if not more:
+                    break
+                data += more
+        return data
+
 
 # noinspection DuplicatedCode
 class PieceManager:
@@ -13,129 +79,226 @@ class PieceManager:
         self.download_dir = Path(download_dir)
 
         self.num_pieces = len(torrent_meta.pieces)
-        self.completed = [False] * self.num_pieces
-        self.blocks = {i: {} for i in range(self.num_pieces)}
+        self.completed = bytearray(self.num_pieces)  # 1 = piece verified and written
+        # Pieces not yet completed; the event is set once this reaches zero
+        self._pieces_left = self.num_pieces
+        self._all_done = asyncio.Event()
+        if not self._pieces_left:
+            self._all_done.set()
+
+        # Pieces being downloaded: one preallocated buffer per piece that
+        # blocks are copied into, plus a received flag per block.
+        self.piece_buffers = {}         # piece_idx → bytearray(piece_len)
+        self.block_received = {}        # piece_idx → bytearray(num_blocks), 1 = stored
+        self._blocks_missing = {}       # piece_idx → blocks still to arrive
+        self._finalizing = set()        # pieces being hashed and written
+        self._buffer_pool = []          # released piece_length buffers
+
+        # hashlib and disk writes release the GIL, so finalize jobs run on
+        # these threads in parallel while the event loop keeps serving peers.
+        self._hash_pool = ThreadPoolExecutor(max_workers=HASH_WORKERS)
+        # Upload reads and startup verification. Owned here rather than the
+        # loop's default executor, so close() can wait for them to finish
+        # before the descriptors they use go away.
+        self._io_pool = ThreadPoolExecutor()
 
         self.in_progress = {}           # piece_idx → set(peers)
         self.piece_events = {}          # piece_idx → asyncio.Event
         self._lock = asyncio.Lock()
         
-        self.peers_provider = None
+        # piece_idx → number of connected peers that have it. Kept current by
+        # the peers themselves (see peer_has_pieces / peer_lost_pieces).
+        # A C int array: 4 bytes per piece instead of a pointer per boxed int.
+        self.availability = array("i", [0]) * self.num_pieces
+
+        # One 0/1 byte per piece: 1 while the piece is neither completed nor
+        # reserved.
+        self._wanted = bytearray(b"\x01") * self.num_pieces
+        # Wanted pieces grouped by availability: _buckets[n] holds those
+        # exactly n peers have, so rarest-first reads the lowest buckets
+        # instead of ranking every candidate.
+        self._buckets = [set(range(self.num_pieces))]
+
+        self._file_fds = []             # one descriptor per meta.files entry
+        self._bytes_on_disk = []        # per file: length that existed before preallocation
 
         self._compute_file_offsets()
         self._prepare_output_paths()
 
     def get_piece_event(self, idx):
-        if idx not in self.piece_events:
-            self.piece_events[idx] = asyncio.Event()
-        return self.piece_events[idx]
+        """
+        Event set when piece idx completes, or fails its hash check so the
+        peers working on it stop; created on reservation.
+        """
+        event = self.piece_events.get(idx)
+        if event is None:
+            event = self.piece_events[idx] = asyncio.Event()
+        return event
 
     def verify_existing_data(self):
         """
         Scan existing files and verify pieces.
         Populate self.completed based on successful hash checks.
+
+        Pieces are read and hashed in batches on a thread pool; hashlib
+        releases the GIL while hashing, so batches run on separate cores.
         """
-        print("[PieceManager] Verifying existing data...")
-        verified_count = 0
-        
-        for idx in range(self.num_pieces):
-            piece_len = self.get_piece_length(idx)
-            
-            piece_data = bytearray()
-            piece_start = idx * self.meta.piece_length
-            remaining = piece_len
-            
-            for f in self.meta.files:
-                f_start = f["offset"]
-                f_end   = f_start + f["length"]
+        logger.info("[PieceManager] Verifying existing data...")
+        self._apply_verified(self._find_verified_pieces())
+
+    async def verify_existing_data_async(self):
+        """
+        verify_existing_data() for use inside the event loop: the disk reads
+        and hashing run on worker threads, so peers keep connecting and
+        handshaking meanwhile. Results are applied back on the loop.
+        """
+        logger.info("[PieceManager] Verifying existing data...")
+        loop = asyncio.get_running_loop()
+        self._apply_verified(await loop.run_in_executor(self._io_pool, self._find_verified_pieces))
+
+    def _find_verified_pieces(self):
+        """Indices of pieces whose on-disk data matches its hash."""
+        batches = [
+            range(start, min(start + VERIFY_BATCH_SIZE, self.num_pieces))
+            for start in range(0, self.num_pieces, VERIFY_BATCH_SIZE)
+        ]
+
+        verified = []
+        with ThreadPoolExecutor(max_workers=os.cpu_count() or 1) as pool:
+            for batch, results in zip(batches, pool.map(self._verify_batch, batches)):
+                verified.extend(compress(batch, results))
+        return verified
+
+    def _apply_verified(self, verified):
+        for idx in verified:
+            self._set_completed(idx)
+
+        logger.info(
+            "[PieceManager] Verification complete. %d/%d pieces available.",
+            len(verified), self.num_pieces,
+        )
+
+    def _verify_batch(self, indices):
+        """Hash-check a batch of pieces on disk. Runs in a worker thread."""
+        return [self._verify_piece(idx) for idx in indices]
+
+    def _verify_piece(self, idx):
+        piece_len = self.get_piece_length(idx)
+
+        # Chunks are streamed into the hash as they are read, rather than
+        # first being copied into one piece-sized buffer.
+        sha1 = hashlib.sha1()
+        read_total = 0
+
+        for i, file_offset, count in self._file_spans(idx * self.meta.piece_length, piece_len):
+            # Bytes past a file's original length were only preallocated;
+            # a piece touching them cannot be on disk, so skip the hashing.
+            if file_offset + count > self._bytes_on_disk[i]:
+                return False
+            try:
+                chunk = _pread_upto(self._file_fds[i], count, file_offset)
+            except OSError:
+                return False
+            if len(chunk) != count:
+                return False
+            sha1.update(chunk)
+            read_total += count
+
+        if read_total != piece_len:
+            return False
 
-                if piece_start >= f_end or piece_start + remaining <= f_start:
+        return sha1.digest() == self.meta.pieces[idx]
+
+    # -------------------------- SWARM AVAILABILITY --------------------------
+
+    def peer_has_pieces(self, pieces):
+        """A peer announced these pieces (BITFIELD or HAVE)."""
+        availability = self.availability
+        wanted = self._wanted
+        bucket = self._bucket
+        num_pieces = self.num_pieces
+        for idx in pieces:
+            if 0 <= idx < num_pieces:
+                count = availability[idx]
+                availability[idx] = count + 1
+                if wanted[idx]:
+                    bucket(count).discard(idx)
+                    bucket(count + 1).add(idx)
+
+    def peer_lost_pieces(self, pieces):
+        """A peer's pieces no longer count (bitfield replaced or peer gone)."""
+        availability = self.availability
+        wanted = self._wanted
+        bucket = self._bucket
+        num_pieces = self.num_pieces
+        for idx in pieces:
+            if 0 <= idx < num_pieces:
+                count = availability[idx]
+                if count <= 0:
                     continue
-                
-                read_abs_start = max(piece_start, f_start)
-                read_abs_end = min(piece_start + remaining, f_end)
-                
-                read_count = read_abs_end - read_abs_start
-                read_file_offset = read_abs_start - f_start
-                
-                out_path = self.download_dir / f["path"]
-                
-                if not out_path.exists():
-                    piece_data = None
-                    break
-                
-                try:
-                    with out_path.open("rb") as fp:
-                        fp.seek(read_file_offset)
-                        chunk = fp.read(read_count)
-                        if len(chunk) != read_count:
-                            piece_data = None
-                            break
-                        piece_data.extend(chunk)
-                except OSError:
-                    piece_data = None
-                    break
-                
-                piece_start += read_count
-                remaining -= read_count
-                if remaining <= 0:
-                    break
-            
-            if piece_data and len(piece_data) == piece_len:
-                actual_hash = hashlib.sha1(piece_data).digest()
-                if actual_hash == self.meta.pieces[idx]:
-                    self.completed[idx] = True
-                    verified_count += 1
-                    # print(f"[PieceManager] Piece {idx} verified.")
-        
-        print(f"[PieceManager] Verification complete. {verified_count}/{self.num_pieces} pieces available.")
+                availability[idx] = count - 1
+                if wanted[idx]:
+                    bucket(count).discard(idx)
+                    bucket(count - 1).add(idx)
 
-    def set_peers_provider(self, provider_func):
+    def _bucket(self, count):
         """
-        Set a function that returns a list of current PeerConnection objects.
-        Used to calculate piece rarity.
+        The bucket for availability count, adding levels as needed. Counts
+        keep changing while a piece is reserved, so a released piece may
+        come back above every level seen so far.
         """
-        self.peers_provider = provider_func
+        buckets = self._buckets
+        while len(buckets) <= count:
+            buckets.append(set())
+        return buckets[count]
+
+    def _unwant(self, idx):
+        """Take idx out of the rarest-first buckets (reserved or completed)."""
+        if self._wanted[idx]:
+            self._wanted[idx] = 0
+            self._bucket(self.availability[idx]).discard(idx)
 
     # -------------------------- RESERVATION LOGIC --------------------------
 
+    def _rarest_wanted(self, peer):
+        """
+        A wanted piece the peer has, from the lowest availability bucket
+        holding one, or None. Ties within a bucket go to whichever piece
+        the set yields first, which also spreads peers over equally rare
+        pieces.
+        """
+        flags = peer.piece_flags()  # One 0/1 byte per piece
+
+        # A peer reporting to this manager is counted in availability, so
+        # whatever it has sits in bucket 1 or above.
+        first = 1 if peer.piece_tracker is self else 0
+        buckets = self._buckets
+        for level in range(first, len(buckets)):
+            for idx in buckets[level]:
+                if flags[idx]:
+                    return idx
+        return None
+
     async def reserve_piece_for_peer(self, peer):
         """
         Reserve a piece for the peer using Rarest-First strategy.
         Returns the piece index or None.
         """
+        # Nothing below awaits, so the scan and the commit run as one step
+        # of the event loop: other peers never wait on this lock while the
+        # scan runs, and no re-check after the scan is needed.
         async with self._lock:
-            candidates = []
-            possible_pieces = peer.available_pieces()
-            
-            # Standard Pass: Find unreserved pieces
-            for idx in possible_pieces:
-                if self.completed[idx]:
-                    continue
-                if idx in self.in_progress:
-                    continue
-                candidates.append(idx)
-
-            if candidates:
-                if not self.peers_provider:
-                    best_piece = candidates[0]
-                else:
-                    all_peers = self.peers_provider()
-                    def get_frequency(piece_idx):
-                        count = 0
-                        for p in all_peers:
-                            if p.has_piece(piece_idx):
-                                count += 1
-                        return count
-                    candidates.sort(key=get_frequency)
-                    best_piece = candidates[0]
-
-                if best_piece not in self.in_progress:
-                    self.in_progress[best_piece] = set()
-                self.in_progress[best_piece].add(peer)
+            # Standard Pass: rarest unreserved piece
+            best_piece = self._rarest_wanted(peer)
+
+            if best_piece is not None:
+                self.in_progress[best_piece] = {peer}
+                self._unwant(best_piece)
+                self.get_piece_event(best_piece)
                 return best_piece
 
             # Endgame Pass: Find in-progress pieces to help with
+            possible_pieces = peer.available_pieces()
             endgame_candidates = []
             for idx in possible_pieces:
                 if self.completed[idx]:
@@ -144,9 +307,10 @@ class PieceManager:
                     endgame_candidates.append(idx)
 
             if endgame_candidates:
-                # Pick the one with fewest peers (spread load)
-                endgame_candidates.sort(key=lambda i: len(self.in_progress[i]))
-                best_piece = endgame_candidates[0]
+                # Pick the one with fewest peers (spread load); only the
+                # minimum is needed, so no sort
+                in_progress = self.in_progress
+                best_piece = min(endgame_candidates, key=lambda i: len(in_progress[i]))
                 self.in_progress[best_piece].add(peer)
                 return best_piece
             
@@ -160,10 +324,33 @@ class PieceManager:
                 peers_set.discard(peer)
                 if not peers_set:
                     self.in_progress.pop(idx, None)
+                    if not self.completed[idx]:
+                        self._bucket(self.availability[idx]).add(idx)
+                        self._wanted[idx] = 1
+
+    def _set_completed(self, idx):
+        if self.completed[idx]:
+            return
+        self.completed[idx] = 1
+        self._unwant(idx)
+        self._pieces_left -= 1
+        if not self._pieces_left:
+            self._all_done.set()
+
+    async def _requeue_failed_piece(self, idx):
+        """A piece failed its hash check: every peer lets go of it and it is wanted again."""
+        async with self._lock:
+            self.in_progress.pop(idx, None)
+            if not self.completed[idx] and not self._wanted[idx]:
+                self._bucket(self.availability[idx]).add(idx)
+                self._wanted[idx] = 1
+            event = self.piece_events.pop(idx, None)
+            if event is not None:
+                event.set()
 
     async def mark_piece_completed(self, idx):
         async with self._lock:
-            self.completed[idx] = True
+            self._set_completed(idx)
             self.in_progress.pop(idx, None)
             if idx in self.piece_events:
                 self.piece_events[idx].set()
@@ -179,46 +366,93 @@ class PieceManager:
     def piece_complete(self, idx):
         if self.completed[idx]:
             return True
-        piece_len = self.get_piece_length(idx)
-        offset = 0
-        while offset < piece_len:
-            if offset not in self.blocks[idx]:
-                return False
-            offset += BLOCK_LEN
-        return True
+        # All blocks are in, but the hash result is not known yet while the
+        # piece is finalizing; peers keep waiting on its event meanwhile.
+        return idx not in self._finalizing and self._blocks_missing.get(idx) == 0
 
     async def store_block(self, idx, offset, block):
-        self.blocks[idx][offset] = block
+        # Late duplicates must not touch a buffer that is being hashed
+        if self.completed[idx] or idx in self._finalizing:
+            return True
+
+        buf = self.piece_buffers.get(idx)
+        if buf is None:
+            piece_len = self.get_piece_length(idx)
+            num_blocks = -(-piece_len // BLOCK_LEN)
+            buf = self.piece_buffers[idx] = self._acquire_buffer(piece_len)
+            self.block_received[idx] = bytearray(num_blocks)
+            self._blocks_missing[idx] = num_blocks
+
+        # Ignore blocks that do not line up with our requests
+        end = offset + len(block)
+        if offset % BLOCK_LEN or end > len(buf) or (end != len(buf) and len(block) != BLOCK_LEN):
+            return True
+
+        buf[offset:end] = block
+        received = self.block_received[idx]
+        block_no = offset // BLOCK_LEN
+        if not received[block_no]:
+            received[block_no] = 1
+            self._blocks_missing[idx] -= 1
 
         if self.piece_complete(idx):
             return await self._finalize_piece(idx)
         return True
 
+    def _acquire_buffer(self, piece_len):
+        """
+        A buffer for a piece. Every piece but the last has the same length,
+        so those buffers are recycled instead of reallocated each piece.
+        Stale contents are harmless: a piece only completes once every
+        block has been written over them.
+        """
+        if piece_len == self.meta.piece_length and self._buffer_pool:
+            return self._buffer_pool.pop()
+        return bytearray(piece_len)
+
+    def _discard_piece_buffer(self, idx):
+        buf = self.piece_buffers.pop(idx, None)
+        if (buf is not None and len(buf) == self.meta.piece_length
+                and len(self._buffer_pool) < PIECE_BUFFER_POOL_SIZE):
+            self._buffer_pool.append(buf)
+        self.block_received.pop(idx, None)
+        self._blocks_missing.pop(idx, None)
+
     async def _finalize_piece(self, idx):
-        # Optimization: If another peer already finished it, return True
-        if self.completed[idx]:
+        # Optimization: If another peer already finished it (or is checking it), return True
+        if self.completed[idx] or idx in self._finalizing:
             return True
 
-        piece_len = self.get_piece_length(idx)
-        assembled = bytearray()
+        # Blocks were written in place, so the buffer already is the piece
+        piece = self.piece_buffers[idx]
+
+        self._finalizing.add(idx)
+        try:
+            # Hash and write in one job: the loop hands the piece off once
+            # and is resumed once. The buffer stays untouched meanwhile (the
+            # piece is finalizing).
+            loop = asyncio.get_running_loop()
+            ok = await loop.run_in_executor(self._hash_pool, self._check_and_write, idx, piece)
+
+            if not ok:
+                logger.warning("[!] Piece %d failed hash check — discarding", idx)
+                self._discard_piece_buffer(idx)
+                await self._requeue_failed_piece(idx)
+                return False
 
-        offset = 0
-        while offset < piece_len:
-            assembled.extend(self.blocks[idx][offset])
-            offset += BLOCK_LEN
+            await self.mark_piece_completed(idx)
+            self._discard_piece_buffer(idx)
+        finally:
+            self._finalizing.discard(idx)
 
-        expected = self.meta.pieces[idx]
-        actual = hashlib.sha1(assembled).digest()
+        logger.info("[✓] Piece %d written", idx)
+        return True
 
-        if expected != actual:
-            print(f"[!] Piece {idx} failed hash check — discarding")
-            self.blocks[idx].clear()
+    def _check_and_write(self, idx, piece):
+        """Worker-thread half of finalize: hash piece, write it if it matches."""
+        if _sha1_digest(piece) != self.meta.pieces[idx]:
             return False
-
-        self._write_piece_to_disk(idx, assembled)
-        await self.mark_piece_completed(idx)
-        self.blocks[idx].clear()
-        print(f"[✓] Piece {idx} written")
+        self._write_piece_to_disk(idx, piece)
         return True
 
     # -------------------------- FILE IO --------------------------
@@ -228,86 +462,114 @@ class PieceManager:
         for f in self.meta.files:
             f["offset"] = offset
             offset += f["length"]
+        # Sorted start offsets, bisected by _file_spans
+        self._file_starts = [f["offset"] for f in self.meta.files]
+
+    def _file_spans(self, start, length):
+        """
+        Yield (file_index, file_offset, count) for each file overlapping the torrent
+        byte range [start, start + length), in order. The first file is
+        found by bisection, so only overlapping files are visited.
+        """
+        files = self.meta.files
+        starts = self._file_starts
+        end = start + length
+        i = bisect_right(starts, start) - 1
+        while start < end and i < len(files):
+            f_end = starts[i] + files[i]["length"]
+            if start < f_end:
+                count = min(end, f_end) - start
+                yield i, start - starts[i], count
+                start += count
+            i += 1
 
     def _prepare_output_paths(self):
+        """
+        Create every output file at its final size and keep it open, so
+        piece writes are a single positional write with no open/seek/stat.
+        """
         for f in self.meta.files:
             output_path = self.download_dir / f["path"]
             os.makedirs(output_path.parent, exist_ok=True)
+            fd = os.open(output_path, _FILE_OPEN_FLAGS, 0o644)
+            self._file_fds.append(fd)
+            self._bytes_on_disk.append(min(os.fstat(fd).st_size, f["length"]))
+            self._preallocate(fd, f["length"])
 
-    def _write_piece_to_disk(self, idx, bytes_data):
-        piece_start = idx * self.meta.piece_length
-        remaining = len(bytes_data)
-        src_pos = 0
-
-        for f in self.meta.files:
-            f_start = f["offset"]
-            f_end   = f_start + f["length"]
+    @staticmethod
+    def _preallocate(fd, length):
+        """
+        Size a file to length. Growth is reserved with posix_fallocate where
+        available, so pieces arriving out of order still land in one
+        contiguous extent instead of a fragmented sparse file.
+        """
+        size = os.fstat(fd).st_size
+        if size == length:
+            return
+        if size < length and hasattr(os, "posix_fallocate"):
+            try:
+                os.posix_fallocate(fd, size, length - size)
+                return
+            except OSError:
+                pass # Filesystem cannot reserve space; a sparse file works too
+        os.ftruncate(fd, length)
 
-            if piece_start >= f_end or piece_start + remaining <= f_start:
-                continue
+    def close(self):
+        """
+        Stop the worker threads, then close the output files. Cancelling a
+        task does not stop a job already running on a thread, so the pools
+        are drained first: a late pwrite/pread must never reach a closed
+        (or reused) descriptor.
+        """
+        self._hash_pool.shutdown(wait=True)
+        self._io_pool.shutdown(wait=True)
+        fds, self._file_fds = self._file_fds, []
+        for fd in fds:
+            os.close(fd)
 
-            write_start = max(0, piece_start - f_start)
-            bytes_to_write = min(f_end - piece_start, remaining)
+    def _write_piece_to_disk(self, idx, bytes_data):
+        # A piece is one contiguous buffer, so each file it touches gets a
+        # single contiguous slice: one pwrite per file, nothing to gather.
+        view = memoryview(bytes_data)
+        src_pos = 0
 
-            out_path = self.download_dir / f["path"]
-            mode = "r+b" if out_path.exists() else "wb"
-            with out_path.open(mode) as fp:
-                fp.seek(write_start)
-                fp.write(bytes_data[src_pos: src_pos + bytes_to_write])
+        for i, file_offset, count in self._file_spans(idx * self.meta.piece_length, len(view)):
+            _pwrite_all(self._file_fds[i], view[src_pos: src_pos + count], file_offset)
+            src_pos += count
 
-            src_pos += bytes_to_write
-            remaining -= bytes_to_write
-            if remaining <= 0:
-                break
-                
     async def read_block(self, piece_idx, offset, length):
         """Read a block of data from disk for uploading (non-blocking)."""
-        return await asyncio.to_thread(self._read_block_sync, piece_idx, offset, length)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._io_pool, self._read_block_sync, piece_idx, offset, length)
 
     def _read_block_sync(self, piece_idx, offset, length):
         """Synchronous implementation of read_block to be run in a thread."""
         if not self.completed[piece_idx]:
             return None
-            
-        piece_start = piece_idx * self.meta.piece_length + offset
-        remaining = length
-        data = bytearray()
-        
-        for f in self.meta.files:
-            f_start = f["offset"]
-            f_end   = f_start + f["length"]
 
-            if piece_start >= f_end or piece_start + remaining <= f_start:
-                continue
-            
-            read_abs_start = max(piece_start, f_start)
-            read_abs_end = min(piece_start + remaining, f_end)
-            
-            read_count = read_abs_end - read_abs_start
-            read_file_offset = read_abs_start - f_start
-            
-            out_path = self.download_dir / f["path"]
-            
+        chunks = []
+
+        # Served from the descriptors opened at startup: no open() per block
+        for i, file_offset, count in self._file_spans(piece_idx * self.meta.piece_length + offset, length):
             try:
-                with out_path.open("rb") as fp:
-                    fp.seek(read_file_offset)
-                    chunk = fp.read(read_count)
-                    if len(chunk) != read_count:
-                        return None
-                    data.extend(chunk)
+                chunk = _pread_upto(self._file_fds[i], count, file_offset)
             except OSError:
                 return None
-                
-            remaining -= read_count
-            piece_start += read_count 
-            
-            if remaining <= 0:
-                break
-                
+            if len(chunk) != count:
+                return None
+            chunks.append(chunk)
+
+        # A block inside one file is returned as read; only blocks that
+        # cross a file boundary are joined (one copy).
+        data = chunks[0] if len(chunks) == 1 else b"".join(chunks)
         if len(data) != length:
             return None
-            
-        return bytes(data)
+
+        return data
 
     def all_pieces_done(self):
-        return all(self.completed)
+        return self._all_done.is_set()
+
+    async def wait_all_done(self):
+        """Wait until every piece is completed."""
+        await self._all_done.wait()
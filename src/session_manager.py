@@ -22,7 +22,6 @@ class SessionManager:
         self.running = False
 
         self.piece_manager = PieceManager(self.meta, download_dir=self.download_dir)
-        self.piece_manager.set_peers_provider(lambda: self.peers)
 
         self.peers = []       # list of PeerConnection objects
         self.pipelines = []   # list of running RequestPipeline tasks
@@ -35,6 +34,7 @@ class SessionManager:
         """
         try:
             conn = PeerConnection(ip, port, self.meta, self.peer_id)
+            conn.piece_tracker = self.piece_manager  # Feeds rarest-first counts
             await conn.connect()
             print(f"[Session] Connected to peer {ip}:{port}")
 
@@ -54,7 +54,7 @@ class SessionManager:
         Start the download session. Verifies existing data,
         launches pipelines for connected peers, and monitors progress.
         """
-        self.piece_manager.verify_existing_data()
+        await self.piece_manager.verify_existing_data_async()
         self.running = True
 
         print("[Session] Starting pipelines...")
@@ -78,14 +78,17 @@ class SessionManager:
             if self.tasks:
                 for t in self.tasks:
                     t.cancel()
+                # Let the pipelines unwind before their files are closed
+                await asyncio.gather(*self.tasks, return_exceptions=True)
 
             for peer in self.peers:
                 peer.close()
 
+            self.piece_manager.close()
+
     async def monitor_until_done(self):
         """
         Monitor piece completion. As soon as all pieces are downloaded,
         return immediately and cancel all pipelines.
         """
-        while not self.piece_manager.all_pieces_done():
-            await asyncio.sleep(0.1)
+        await self.piece_manager.wait_all_done()
@@ -1,55 +1,19 @@
 """
 Parses .torrent files and extracts metadata.
 """
+import asyncio
 import hashlib
-import re
+import mmap
+import os
+import pickle
 from pathlib import Path
 
-from bencode import decode
-from bencode.structure import BencodeDict, BencodeList, BencodeString
+from bencode.decoder import BencodeDecoder
 
-
-def extract_info_bytes(raw: bytes) -> bytes:
-    """
-    Extract the exact bencoded 'info' dictionary byte slice.
-    This guarantees correct SHA-1 infohash as required by BitTorrent spec.
-    """
-    key = b"4:info"
-    start = raw.index(key) + len(key)
-
-    i = start
-
-    def parse(idx):
-        b = raw[idx:idx+1]
-
-        # Integer: i123e
-        if b == b"i":
-            _end = raw.index(b"e", idx)
-            return _end + 1
-
-        # List: l ... e
-        if b == b"l":
-            idx += 1
-            while raw[idx:idx+1] != b"e":
-                idx = parse(idx)
-            return idx + 1
-
-        # Dict: d ... e
-        if b == b"d":
-            idx += 1
-            while raw[idx:idx+1] != b"e":
-                idx = parse(idx)  # key
-                idx = parse(idx)  # value
-            return idx + 1
-
-        # String: len:value
-        m = re.match(rb"(\d+):", raw[idx:])
-        strlen = int(m.group(1))
-        offset = idx + len(m.group(0))
-        return offset + strlen
-
-    end = parse(i)
-    return raw[start:end]
+# Parsed metadata is pickled here so restarts can skip decoding the torrent
+CACHE_DIR = Path.home() / ".cache" / "bittorrent-client"
+# Bump when TorrentMeta's attributes change so stale pickles are ignored
+_CACHE_VERSION = 3
 
 
 class TorrentMeta:
@@ -59,63 +23,61 @@ class TorrentMeta:
     def __init__(self, path: Path):
         self.path = Path(path)
 
-        raw = self.path.read_bytes()
-
-        self.info_bytes = extract_info_bytes(raw)
-        self.info_hash = hashlib.sha1(self.info_bytes).digest()
+        # Decode straight from a read-only mapping of the file; the info hash
+        # is then taken over the mapped 'info' span without copying it out.
+        with self.path.open("rb") as fp, \
+                mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ) as raw:
+            decoder = BencodeDecoder(raw, raw=True)
+            root = decoder.decode()
+            if not isinstance(root, dict):
+                raise ValueError("Invalid torrent: root must be a dictionary")
 
-        root = decode(raw)
-        if not isinstance(root, BencodeDict):
-            raise ValueError("Invalid torrent: root must be a dictionary")
+            if b"info" not in root:
+                raise ValueError("Torrent missing 'info' dictionary")
 
-        self.data = root.value
+            # Hash the exact 'info' bytes from the file, as required by the spec.
+            info_start, info_end = decoder.info_span
+            with memoryview(raw) as view:
+                self.info_hash = hashlib.sha1(view[info_start:info_end]).digest()
 
-        if b"info" not in self.data:
-            raise ValueError("Torrent missing 'info' dictionary")
+        self.data = root
 
-        info_b = self.data[b"info"]
-        self.info = info_b.value
+        self.info = self.data[b"info"]
 
         name_b = self.info.get(b"name")
-        self.name = name_b.value.decode() if isinstance(name_b, BencodeString) else None
+        self.name = name_b.decode() if isinstance(name_b, bytes) else None
 
         ann_b = self.data.get(b"announce")
-        self.announce = ann_b.value.decode() if isinstance(ann_b, BencodeString) else None
+        self.announce = ann_b.decode() if isinstance(ann_b, bytes) else None
 
         self.announce_list = None
         ann_list_b = self.data.get(b"announce-list")
 
-        if isinstance(ann_list_b, BencodeList):
+        if isinstance(ann_list_b, list):
             tiers = []
-            for tier in ann_list_b.value:
+            for tier in ann_list_b:
                 urls = []
-                for u in tier.value:
-                    if isinstance(u, BencodeString):
-                        urls.append(u.value.decode())
+                for u in tier:
+                    if isinstance(u, bytes):
+                        urls.append(u.decode())
                 if urls:
                     tiers.append(urls)
             if tiers:
                 self.announce_list = tiers
 
-        piece_len_b = self.info.get(b"piece length")
-        self.piece_length = piece_len_b.value
+        self.piece_length = self.info.get(b"piece length")
 
-        pieces_b = self.info.get(b"pieces")
-        raw_pieces = pieces_b.value
+        raw_pieces = self.info.get(b"pieces")
         self.pieces = [raw_pieces[i:i+20] for i in range(0, len(raw_pieces), 20)]
 
         if b"files" in self.info:
             self.files = []
-            for f_entry in self.info[b"files"].value:
-                entry = f_entry.value
-                length_b = entry[b"length"]
-                parts = [p.value.decode() for p in entry[b"path"].value]
+            for entry in self.info[b"files"]:
+                parts = [p.decode() for p in entry[b"path"]]
                 path = "/".join(parts)
-                self.files.append({"length": length_b.value, "path": path})
+                self.files.append({"length": entry[b"length"], "path": path})
         else:
-            name_b = self.info[b"name"]
-            length_b = self.info[b"length"]
-            self.files = [{"length": length_b.value, "path": name_b.value.decode()}]
+            self.files = [{"length": self.info[b"length"], "path": self.info[b"name"].decode()}]
 
         self.total_length = sum(f["length"] for f in self.files)
         self.is_multi = b"files" in self.info
@@ -126,6 +88,50 @@ class TorrentMeta:
         for f in self.files:
             f["abs_path"] = f"{self.name}/{f['path']}" if self.is_multi else self.name
 
+    @classmethod
+    async def load(cls, path: Path, cache_dir: Path = None):
+        """
+        Async counterpart of from_cache_or_parse: reads, decodes and hashes
+        the torrent in a worker thread so the event loop stays free.
+        """
+        return await asyncio.to_thread(cls.from_cache_or_parse, path, cache_dir)
+
+    @classmethod
+    def from_cache_or_parse(cls, path: Path, cache_dir: Path = None):
+        """
+        Return the TorrentMeta for path, loading it from the metadata cache
+        when the file is unchanged and parsing (then caching) it otherwise.
+        Cache entries are keyed by the file's path, size and mtime.
+        """
+        path = Path(path)
+        cache_dir = Path(cache_dir) if cache_dir else CACHE_DIR
+
+        st = path.stat()
+        key_src = f"{_CACHE_VERSION}:{path.resolve()}:{st.st_size}:{st.st_mtime_ns}"
+        cache_key = hashlib.sha1(key_src.encode()).hexdigest()[:16]
+        cache_file = cache_dir / f"meta-{cache_key}.pkl"
+
+        try:
+            with cache_file.open("rb") as fp:
+                meta = pickle.load(fp)
+            if isinstance(meta, cls):
+                return meta
+        except (OSError, EOFError, pickle.UnpicklingError, AttributeError):
+            pass # Missing or unreadable cache entry, fall back to parsing
+
+        meta = cls(path)
+
+        try:
+            cache_dir.mkdir(parents=True, exist_ok=True)
+            tmp_file = cache_file.with_suffix(".tmp")
+            with tmp_file.open("wb") as fp:
+                pickle.dump(meta, fp, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_file, cache_file)
+        except OSError:
+            pass # Caching is best-effort
+
+        return meta
+
     def __repr__(self):
         return (
             f"TorrentMeta(name={self.name!r}, files={len(self.files)}, pieces={self.num_pieces}, "
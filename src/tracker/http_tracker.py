@@ -6,10 +6,14 @@ from typing import List, Tuple
 import aiohttp
 
 from bencode import decode
-from bencode.structure import BencodeDict, BencodeList, BencodeInt, BencodeString
 from .utils import compact_to_peers
 
 
+def _pct_encode(b: bytes) -> str:
+    """Percent-encodes every byte, as trackers expect for raw hash fields."""
+    return ''.join(f'%{byte:02X}' for byte in b)
+
+
 class HTTPTrackerClient:
     """
     Communicates with an HTTP tracker to announce download status and retrieve peers.
@@ -23,14 +27,24 @@ class HTTPTrackerClient:
         if not self.url:
             raise ValueError("No announce URL provided for HTTPTrackerClient")
 
+        # info_hash and peer_id never change, so percent-encode them once
+        # instead of on every re-announce.
+        self._hash_query = (
+            f"info_hash={_pct_encode(torrent_meta.info_hash)}"
+            f"&peer_id={_pct_encode(peer_id)}"
+        )
+
     @staticmethod
     def _compact_to_peers(blob: bytes) -> List[Tuple[str, int]]:
         return compact_to_peers(blob)
 
-    async def announce(self) -> List[Tuple[str, int]]:
+    async def announce(self, session: aiohttp.ClientSession = None) -> List[Tuple[str, int]]:
+        """
+        Announce to the tracker and return its peer list.
+        Pass a shared session to reuse pooled connections across announces;
+        without one a short-lived session is opened for this request.
+        """
         params = {
-            "info_hash": self.meta.info_hash,
-            "peer_id": self.peer_id,
             "port": self.port,
             "uploaded": 0,
             "downloaded": 0,
@@ -39,45 +53,40 @@ class HTTPTrackerClient:
             "event": "started",
         }
 
-        def pct_encode(b: bytes) -> str:
-            return ''.join(f'%{byte:02X}' for byte in b)
-
-        encoded = {}
-        for k, v in params.items():
-            if isinstance(v, bytes):
-                encoded[k] = pct_encode(v)
-            else:
-                encoded[k] = str(v)
+        encoded = {k: str(v) for k, v in params.items()}
 
-        async with aiohttp.ClientSession() as session:
-            query = "&".join(f"{k}={v}" for k, v in encoded.items())
-            full_url = f"{self.url}?{query}"
+        query = self._hash_query + "&" + "&".join(f"{k}={v}" for k, v in encoded.items())
+        full_url = f"{self.url}?{query}"
 
+        if session is not None:
             async with session.get(full_url) as resp:
                 data = await resp.read()
+        else:
+            async with aiohttp.ClientSession() as own_session:
+                async with own_session.get(full_url) as resp:
+                    data = await resp.read()
 
-        root = decode(data).value
+        root = decode(data, raw=True)
+        if not isinstance(root, dict):
+            raise ValueError("Tracker returned an invalid response")
 
         failure = root.get(b"failure reason")
         if failure:
-            msg = failure if isinstance(failure, bytes) else failure.value
-            raise RuntimeError("Tracker error: " + msg.decode())
+            raise RuntimeError("Tracker error: " + failure.decode())
 
         peers_field = root.get(b"peers")
 
-        if isinstance(peers_field, BencodeList):
+        if isinstance(peers_field, list):
             peers = []
-            for peer_dict_b in peers_field.value:
-                if isinstance(peer_dict_b, BencodeDict):
-                    peer_dict = peer_dict_b.value
+            for peer_dict in peers_field:
+                if isinstance(peer_dict, dict):
                     ip_b = peer_dict.get(b"ip")
                     port_b = peer_dict.get(b"port")
 
-                    if isinstance(ip_b, BencodeString) and isinstance(port_b, BencodeInt):
-                        peers.append((ip_b.value.decode(), port_b.value))
+                    if isinstance(ip_b, bytes) and isinstance(port_b, int):
+                        peers.append((ip_b.decode(), port_b))
             return peers
-        elif isinstance(peers_field, bytes) or (hasattr(peers_field, "value") and isinstance(peers_field.value, bytes)):
-            blob = peers_field if isinstance(peers_field, bytes) else peers_field.value
-            return self._compact_to_peers(blob)
+        elif isinstance(peers_field, bytes):
+            return self._compact_to_peers(peers_field)
 
         raise ValueError("Tracker returned invalid peer list")
@@ -1,6 +1,8 @@
 import asyncio
 from typing import List, Tuple
 
+import aiohttp
+
 from .http_tracker import HTTPTrackerClient
 from .udp_tracker import UDPTrackerClient
 
@@ -12,6 +14,9 @@ class TrackerClient:
         self.port = port
 
         self.trackers = []
+        # One pooled HTTP session shared by every HTTP tracker and announce
+        self._http_session = None
+
         if self.meta.announce:
             self._add_tracker_client(self.meta.announce)
         
@@ -29,9 +34,23 @@ class TrackerClient:
         elif url.startswith("udp"):
             self.trackers.append(UDPTrackerClient(self.meta, self.peer_id, self.port, url=url))
 
+    def _get_http_session(self) -> aiohttp.ClientSession:
+        if self._http_session is None or self._http_session.closed:
+            self._http_session = aiohttp.ClientSession()
+        return self._http_session
+
+    async def close(self):
+        """Close the shared HTTP session, if one was opened."""
+        if self._http_session is not None:
+            await self._http_session.close()
+            self._http_session = None
+
     async def _announce_one(self, client) -> List[Tuple[str, int]]:
         try:
-            peers = await client.announce()
+            if isinstance(client, HTTPTrackerClient):
+                peers = await client.announce(session=self._get_http_session())
+            else:
+                peers = await client.announce()
             print(f"[Tracker] {type(client).__name__} {client.url} returned {len(peers)} peers.")
             return peers
         except Exception as e:
@@ -78,17 +78,26 @@ class UDPTrackerClient:
         self.host = parsed.hostname
         self.tracker_port = parsed.port or 80
 
+        # Resolved lazily in announce() so lookups for all trackers overlap
+        self.host_ip = None
+
+    @staticmethod
+    def _compact_to_peers(blob: bytes) -> List[Tuple[str, int]]:
+        return compact_to_peers(blob)
+
+    async def _resolve_host(self):
+        """Resolve the tracker hostname without blocking the event loop."""
         # Resolve IP to avoid WinError 10022 on Windows with asyncio UDP
+        loop = asyncio.get_running_loop()
         try:
-            self.host_ip = socket.gethostbyname(self.host)
+            infos = await loop.getaddrinfo(
+                self.host, self.tracker_port, family=socket.AF_INET, type=socket.SOCK_DGRAM
+            )
+            self.host_ip = infos[0][4][0]
         except socket.error as e:
             print(f"[Tracker] Could not resolve {self.host}: {e}")
             self.host_ip = self.host
 
-    @staticmethod
-    def _compact_to_peers(blob: bytes) -> List[Tuple[str, int]]:
-        return compact_to_peers(blob)
-
     async def _create_endpoint(self):
         loop = asyncio.get_running_loop()
         self.transport, self.protocol = await loop.create_datagram_endpoint(
@@ -103,6 +112,9 @@ class UDPTrackerClient:
         print(f"[Tracker] UDP tracker request timed out")
 
     async def announce(self) -> List[Tuple[str, int]]:
+        if self.host_ip is None:
+            await self._resolve_host()
+
         if not self.transport:
             await self._create_endpoint()
 
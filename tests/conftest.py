@@ -0,0 +1,37 @@
+from types import SimpleNamespace
+
+import pytest
+
+from pieces.piece_manager import PieceManager
+
+
+def _meta(piece_length, files, pieces):
+    """Minimal torrent metadata; files are (path, length) pairs."""
+    return SimpleNamespace(
+        piece_length=piece_length,
+        total_length=sum(length for _, length in files),
+        files=[{"length": length, "path": path} for path, length in files],
+        pieces=list(pieces),
+    )
+
+
+@pytest.fixture
+def make_piece_manager(tmp_path):
+    """
+    Build PieceManagers writing under tmp_path, either from piece_length,
+    files and pieces (see _meta) or from a ready meta object. Every manager
+    is closed after the test, releasing its descriptors and worker threads.
+    """
+    managers = []
+
+    def make(piece_length=None, files=None, pieces=None, meta=None):
+        if meta is None:
+            meta = _meta(piece_length, files, pieces)
+        pm = PieceManager(meta, download_dir=tmp_path)
+        managers.append(pm)
+        return pm
+
+    yield make
+
+    for pm in managers:
+        pm.close()
@@ -1,5 +1,6 @@
+import pytest
 
-from bencode.decoder import decode
+from bencode.decoder import BencodeDecodeError, BencodeDecoder, decode
 from bencode.encoder import encode
 from bencode.structure import BencodeInt, BencodeString, BencodeList, BencodeDict
 
@@ -45,3 +46,31 @@ def test_dict():
     enc = encode(obj)
     print("Re-encoded:", enc)
     assert enc == b"d3:cow3:mooe"
+
+
+def test_info_span():
+    print("Testing info span tracking...")
+    raw = b"d8:announce3:url4:infod4:name1:xee"
+    decoder = BencodeDecoder(raw)
+    decoder.decode()
+    start, end = decoder.info_span
+    print("Info span:", start, end)
+    assert raw[start:end] == b"d4:name1:xe"
+
+
+def test_int_edge_cases():
+    print("Testing negative and malformed integers...")
+    assert decode(b"i-42e").value == -42
+    assert decode(b"i0e").value == 0
+
+    for bad in (b"ie", b"i-e", b"i12", b"i1x2e", b"3:ab", b"3x:abc"):
+        with pytest.raises(BencodeDecodeError):
+            decode(bad)
+
+
+def test_raw_mode():
+    print("Testing raw (unwrapped) decoding...")
+    obj = decode(b"d4:listli1e3:abce3:numi-7ee", raw=True)
+    print("Decoded:", obj)
+    assert obj == {b"list": [1, b"abc"], b"num": -7}
+    assert encode(obj) == b"d4:listli1e3:abce3:numi-7ee"
@@ -1,3 +1,5 @@
+import threading
+
 import pytest
 
 from peer.choke_manager import ChokeManager
@@ -18,7 +20,7 @@ class MockPeer:
         
         self.sent_messages = []
 
-    def reset_stats(self):
+    def reset_stats(self, now=None):
         return self.d_bytes, self.u_bytes, self.duration
     
     def reset_download_stats(self):
@@ -135,3 +137,94 @@ async def test_optimistic_unchoke():
     optimistic = [p for p in unchoked if p not in top_two]
     assert len(optimistic) == 1
     print(f"Optimistic peer was {optimistic[0].ip}")
+
+@pytest.mark.asyncio
+async def test_failed_send_does_not_block_others():
+    """
+    A peer whose socket fails mid-round must not stop the other transitions.
+    """
+    class BrokenPeer(MockPeer):
+        async def send(self, msg_id, payload=b""):
+            self.closed = True
+            raise ConnectionResetError("peer went away")
+
+    # Min 2 slots: the broken peer is first, "1" must still be unchoked.
+    cm = ChokeManager()
+    peers = [BrokenPeer("0", d_rate=5000), MockPeer("1", d_rate=1000)]
+
+    await cm._recalculate(peers)
+
+    unchoked = [p.ip for p in peers if not p.am_choking]
+    print(f"Unchoked despite failure: {unchoked}")
+    assert unchoked == ["1"]
+
+@pytest.mark.asyncio
+async def test_steady_state_sends_nothing():
+    """
+    When the same peers win again, the second round must not send anything.
+    """
+    cm = ChokeManager()
+    peers = [MockPeer(str(i), d_rate=1000 * (i + 1)) for i in range(4)]
+
+    await cm._recalculate(peers)
+    first_round = [len(p.sent_messages) for p in peers]
+
+    await cm._recalculate(peers)
+    second_round = [len(p.sent_messages) for p in peers]
+    print(f"Messages after round 1: {first_round}, round 2: {second_round}")
+
+    assert sum(first_round) > 0
+    assert second_round == first_round
+
+@pytest.mark.asyncio
+async def test_peers_leaving_top_are_choked():
+    """
+    Peers that drop out of the top slots get a CHOKE on the next round.
+    """
+    cm = ChokeManager()
+    peers = [MockPeer(str(i), d_rate=1000 * (i + 1)) for i in range(4)]
+
+    await cm._recalculate(peers)
+    assert [p.ip for p in peers if not p.am_choking] == ["2", "3"]
+
+    # The slow peers become the fast ones (same total, so still 2 slots)
+    for p in peers:
+        p.d_bytes = (4 - int(p.ip)) * 10000
+    await cm._recalculate(peers)
+
+    unchoked = [p.ip for p in peers if not p.am_choking]
+    print(f"Unchoked after swap: {unchoked}")
+    assert unchoked == ["0", "1"]
+    assert peers[3].sent_messages[-1] == MessageID.CHOKE
+
+@pytest.mark.asyncio
+async def test_large_swarm_threaded_scoring():
+    """
+    Swarms above the threshold are scored off the event loop with the same result.
+    """
+    cm = ChokeManager()
+    n = ChokeManager.THREADED_SCORING_MIN_PEERS + 10
+    peers = [MockPeer(str(i), d_rate=i) for i in range(n)]
+
+    # Record which thread each scoring pass runs on
+    scoring_threads = []
+    score_batch = cm.scorer.score_batch
+
+    def recording_score_batch(*args):
+        scoring_threads.append(threading.current_thread())
+        return score_batch(*args)
+
+    cm.scorer.score_batch = recording_score_batch
+
+    await cm._recalculate(peers)
+
+    unchoked = [p.ip for p in peers if not p.am_choking]
+    print(f"Unchoked in large swarm: {unchoked}, scored on: {scoring_threads}")
+    assert len(scoring_threads) == 1
+    assert scoring_threads[0] is not threading.current_thread()
+    # ~21 KB/s global download + margin -> 3 slots, taken by the fastest peers
+    assert unchoked == [str(n - 3), str(n - 2), str(n - 1)]
+
+    # Below the threshold the same pass stays on the loop's thread
+    await cm._recalculate(peers[:ChokeManager.THREADED_SCORING_MIN_PEERS - 1])
+    assert scoring_threads[1] is threading.current_thread()
@@ -1,4 +1,4 @@
-
+import asyncio
 from pathlib import Path
 
 from torrent.metainfo import TorrentMeta
@@ -19,3 +19,26 @@ def test_metainfo_load():
 
     print("Info hash:", meta.info_hash.hex())
     print("Files:", meta.files)
+
+
+def test_metainfo_cache(tmp_path):
+    path = Path("torrents/sample.torrent")
+
+    first = TorrentMeta.from_cache_or_parse(path, cache_dir=tmp_path)
+    print("Cache entries:", list(tmp_path.iterdir()))
+    assert len(list(tmp_path.glob("meta-*.pkl"))) == 1
+
+    second = TorrentMeta.from_cache_or_parse(path, cache_dir=tmp_path)
+    assert second is not first
+    assert second.info_hash == first.info_hash
+    assert second.pieces == first.pieces
+    assert second.files == first.files
+
+
+def test_metainfo_async_load(tmp_path):
+    path = Path("torrents/sample.torrent")
+
+    meta = asyncio.run(TorrentMeta.load(path, cache_dir=tmp_path))
+    print("Loaded asynchronously:", meta)
+
+    assert meta.info_hash == TorrentMeta(path).info_hash
@@ -0,0 +1,204 @@
+import asyncio
+import socket
+
+import pytest
+
+from peer.message_types import MessageID
+from peer.peer_connection import PeerConnection
+from peer.peer_protocol import build_handshake, build_message, HANDSHAKE_LEN
+
+
+class FakeMeta:
+    info_hash = b"\x00" * 20
+    num_pieces = 20
+
+
+@pytest.mark.asyncio
+async def test_bitfield_and_have_tracking():
+    peer = PeerConnection("127.0.0.1", 6881, FakeMeta(), b"P" * 20)
+    peer.attach(asyncio.StreamReader(), None)
+
+    # Pieces 0, 7, 9 set; the trailing spare bits are zero.
+    bitfield = bytes([0b10000001, 0b01000000, 0b00000000])
+    peer.reader.feed_data(build_message(MessageID.BITFIELD, bitfield))
+    peer.reader.feed_data(build_message(MessageID.HAVE, (15).to_bytes(4, "big")))
+    peer.reader.feed_data(build_message(MessageID.UNCHOKE))
+
+    msg_id, payload = await peer.read_message()
+    assert msg_id == MessageID.BITFIELD and payload == bitfield
+    print("After BITFIELD:", list(peer.available_pieces()))
+    assert list(peer.available_pieces()) == [0, 7, 9]
+
+    await peer.read_message()
+    print("After HAVE:", list(peer.available_pieces()))
+    assert list(peer.available_pieces()) == [0, 7, 9, 15]
+    assert peer.has_piece(15) and not peer.has_piece(8)
+
+    await peer.read_message()
+    assert peer.peer_choking is False
+
+
+@pytest.mark.asyncio
+async def test_connect_disables_nagle():
+    async def handle(reader, writer):
+        await reader.readexactly(HANDSHAKE_LEN)
+        writer.write(build_handshake(FakeMeta.info_hash, b"R" * 20))
+        await writer.drain()
+
+    server = await asyncio.start_server(handle, "127.0.0.1", 0)
+    port = server.sockets[0].getsockname()[1]
+
+    peer = PeerConnection("127.0.0.1", port, FakeMeta(), b"P" * 20)
+    remote_id = await peer.connect()
+    sock = peer.writer.get_extra_info("socket")
+    nodelay = sock.getsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY)
+    print("Remote peer id:", remote_id, "TCP_NODELAY:", nodelay)
+
+    assert remote_id == b"R" * 20
+    assert nodelay != 0
+
+    peer.close()
+    server.close()
+    await server.wait_closed()
+
+
+@pytest.mark.asyncio
+async def test_payloads_survive_later_reads():
+    peer = PeerConnection("127.0.0.1", 6881, FakeMeta(), b"P" * 20)
+    peer.attach(asyncio.StreamReader(), None)
+
+    first = (0).to_bytes(4, "big") + (0).to_bytes(4, "big") + b"a" * 16384
+    second = (0).to_bytes(4, "big") + (16384).to_bytes(4, "big") + b"b" * 16384
+    peer.reader.feed_data(build_message(MessageID.PIECE, first))
+    peer.reader.feed_data(build_message(MessageID.PIECE, second))
+
+    _, payload1 = await peer.read_message()
+    _, payload2 = await peer.read_message()
+    print("Payload sizes:", len(payload1), len(payload2))
+
+    assert payload1 == first and payload2 == second
+    assert peer.downloaded_sample == len(first) + len(second)
+
+
+class RecordingWriter:
+    def __init__(self):
+        self.writes = []
+        self.drains = 0
+
+    def write(self, data):
+        self.writes.append(bytes(data))
+
+    async def drain(self):
+        self.drains += 1
+
+    def close(self):
+        pass
+
+    async def wait_closed(self):
+        pass
+
+
+@pytest.mark.asyncio
+async def test_requests_coalesce_into_one_write():
+    peer = PeerConnection("127.0.0.1", 6881, FakeMeta(), b"P" * 20)
+    writer = RecordingWriter()
+    peer.attach(asyncio.StreamReader(), writer)
+
+    # Two refills of the same piece, three blocks in all
+    peer.send_requests(0, 0, 16384)
+    peer.send_requests(0, 16384, 3 * 16384)
+    assert writer.writes == []
+
+    await peer.flush()
+    print("Writes after flush:", [len(w) for w in writer.writes])
+    assert len(writer.writes) == 1 and len(writer.writes[0]) == 3 * 17
+
+    # A queued request is written ahead of the next regular message
+    peer.send_requests(1, 0, 16384)
+    await peer.send(MessageID.INTERESTED)
+    assert len(writer.writes) == 2
+    assert writer.writes[1][4] == MessageID.REQUEST and writer.writes[1][-1] == MessageID.INTERESTED
+
+
+@pytest.mark.asyncio
+async def test_only_data_frames_drain():
+    peer = PeerConnection("127.0.0.1", 6881, FakeMeta(), b"P" * 20)
+    writer = RecordingWriter()
+    peer.attach(asyncio.StreamReader(), writer)
+
+    await peer.send(MessageID.UNCHOKE)
+    await peer.send(MessageID.INTERESTED)
+    assert writer.drains == 0 and len(writer.writes) == 2
+    assert peer.am_choking is False and peer.am_interested is True
+
+    await peer.send(MessageID.PIECE, bytes(8) + b"x" * 16384)
+    print("Drains after PIECE:", writer.drains)
+    assert writer.drains == 1
+
+
+class CountingTracker:
+    def __init__(self, num_pieces):
+        self.counts = [0] * num_pieces
+        self.lost_calls = 0
+
+    def peer_has_pieces(self, pieces):
+        for idx in pieces:
+            self.counts[idx] += 1
+
+    def peer_lost_pieces(self, pieces):
+        self.lost_calls += 1
+        for idx in pieces:
+            self.counts[idx] -= 1
+
+
+@pytest.mark.asyncio
+async def test_piece_tracker_follows_peer():
+    tracker = CountingTracker(FakeMeta.num_pieces)
+    peer = PeerConnection("127.0.0.1", 6881, FakeMeta(), b"P" * 20)
+    peer.piece_tracker = tracker
+    peer.attach(asyncio.StreamReader(), RecordingWriter())
+
+    peer.reader.feed_data(build_message(MessageID.HAVE, (3).to_bytes(4, "big")))
+    peer.reader.feed_data(build_message(MessageID.BITFIELD, bytes([0b00010001, 0, 0])))
+    peer.reader.feed_data(build_message(MessageID.HAVE, (7).to_bytes(4, "big")))  # already had it
+    for _ in range(3):
+        await peer.read_message()
+
+    print("Tracked counts:", tracker.counts)
+    assert [i for i, c in enumerate(tracker.counts) if c] == [3, 7]
+    assert max(tracker.counts) == 1
+
+    # A repeated BITFIELD reports only what it adds; nothing is withdrawn
+    peer.reader.feed_data(build_message(MessageID.BITFIELD, bytes([0b00010001, 0b10000000, 0])))
+    await peer.read_message()
+    assert [i for i, c in enumerate(tracker.counts) if c] == [3, 7, 8]
+    assert tracker.lost_calls == 0
+
+    peer.close()
+    assert not any(tracker.counts)
+
+
+class FailingWriter(RecordingWriter):
+    def write(self, data):
+        raise ConnectionResetError("peer went away")
+
+
+@pytest.mark.asyncio
+async def test_buffered_frames_after_failed_send_are_not_tracked():
+    tracker = CountingTracker(FakeMeta.num_pieces)
+    peer = PeerConnection("127.0.0.1", 6881, FakeMeta(), b"P" * 20)
+    peer.piece_tracker = tracker
+    peer.attach(asyncio.StreamReader(), FailingWriter())
+
+    peer.reader.feed_data(build_message(MessageID.HAVE, (1).to_bytes(4, "big")))
+    await peer.read_message()
+
+    # A failed CHOKE marks the peer closed while a HAVE is still buffered
+    peer.reader.feed_data(build_message(MessageID.HAVE, (2).to_bytes(4, "big")))
+    with pytest.raises(ConnectionResetError):
+        await peer.send(MessageID.CHOKE)
+    assert peer.closed
+
+    await peer.read_message()
+    print("Counts after buffered HAVE:", tracker.counts)
+    assert not any(tracker.counts)
@@ -1,6 +1,9 @@
 
 from peer.message_types import MessageID
-from peer.peer_protocol import build_handshake, parse_handshake, build_message, parse_message
+from peer.peer_protocol import (
+    build_handshake, parse_handshake, build_message, parse_message, CONTROL_FRAMES,
+    build_requests,
+)
 
 
 def test_handshake_roundtrip():
@@ -27,3 +30,37 @@ def test_message_build_parse():
     print("Parsed:", parsed)
 
     assert parsed[0] == MessageID.INTERESTED
+
+
+def test_control_frames():
+    for msg_id, frame in CONTROL_FRAMES.items():
+        print("Control frame:", msg_id.name, frame)
+        assert frame == build_message(msg_id)
+        assert parse_message(frame) == (msg_id, b"", 5)
+
+
+def _request_frame(index, begin, length):
+    fields = index.to_bytes(4, "big") + begin.to_bytes(4, "big") + length.to_bytes(4, "big")
+    return build_message(MessageID.REQUEST, fields)
+
+
+def test_batched_requests_match_single_frames():
+    # Two full blocks and a short tail
+    batch = build_requests(5, 0, 2 * 16384 + 100, 16384)
+    print("Batched REQUEST bytes:", len(batch))
+
+    singles = _request_frame(5, 0, 16384) + _request_frame(5, 16384, 16384) + _request_frame(5, 32768, 100)
+    assert batch == singles
+    assert build_requests(5, 100, 100, 16384) == b""
+
+
+def test_handshake_rejects_bad_protocol():
+    hs = bytearray(build_handshake(b"A" * 20, b"B" * 20))
+    hs[1:4] = b"Bad"
+
+    try:
+        parse_handshake(bytes(hs))
+    except ValueError as e:
+        print("Rejected:", e)
+    else:
+        assert False, "bad protocol string accepted"
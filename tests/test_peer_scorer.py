@@ -0,0 +1,22 @@
+import math
+
+from peer.peer_scorer import PeerStats
+
+
+def test_variance_penalty_running_sums():
+    st = PeerStats(history_len=5)
+    samples = [1000, 3000, 2000, 8000, 500, 4000, 4000, 7000, 100, 2500, 6000, 3000]
+
+    for rate in samples:
+        st.add_sample(rate)
+
+        window = list(st.rate_history)
+        if len(window) < 2:
+            continue
+        mean = sum(window) / len(window)
+        std_dev = math.sqrt(sum((x - mean) ** 2 for x in window) / len(window))
+        expected = 1.0 / (1.0 + std_dev / mean)
+        print(f"rate={rate} penalty={st.get_variance_penalty():.6f} expected={expected:.6f}")
+        assert math.isclose(st.get_variance_penalty(), expected, rel_tol=1e-9)
+
+    assert list(st.rate_history) == samples[-5:]
@@ -1,14 +1,17 @@
 import asyncio
 import hashlib
+import threading
+import time
 from pathlib import Path
 
 from peer.message_types import BLOCK_LEN
-from pieces.piece_manager import PieceManager
 from torrent.metainfo import TorrentMeta
 
 
 async def fake_piece_download(pm):
     class DummyPeer:
+        piece_tracker = None
+        def piece_flags(self): return bytearray(b"\x01") * pm.num_pieces
         def has_piece(self, idx): return True
         def available_pieces(self): return range(pm.num_pieces)
 
@@ -25,9 +28,8 @@ async def fake_piece_download(pm):
         offset += block_len
 
 
-def test_piece_manager():
-    meta = TorrentMeta(Path("torrents/sample.torrent"))
-    pm = PieceManager(meta, download_dir="downloads_test")
+def test_piece_manager(make_piece_manager):
+    pm = make_piece_manager(meta=TorrentMeta(Path("torrents/sample.torrent")))
 
     # Fix expected hash for testing:
     piece_len = pm.get_piece_length(0)
@@ -35,4 +37,261 @@ def test_piece_manager():
 
     asyncio.run(fake_piece_download(pm))
 
-    assert pm.completed[0] is True
+    assert pm.completed[0] == 1
+
+
+def test_verify_existing_data(tmp_path, make_piece_manager):
+    (tmp_path / "file.bin").write_bytes(bytes(2 * BLOCK_LEN))
+
+    pm = make_piece_manager(
+        BLOCK_LEN, [("file.bin", 2 * BLOCK_LEN)],
+        [hashlib.sha1(bytes(BLOCK_LEN)).digest(), b"\x00" * 20],
+    )
+    pm.verify_existing_data()
+
+    assert pm.completed[0] == 1
+    assert pm.completed[1] == 0
+    assert not pm.all_pieces_done()
+
+
+def test_rarest_first_reservation(make_piece_manager):
+    class ListPeer:
+        piece_tracker = None
+        def __init__(self, pieces): self.pieces = pieces
+        def piece_flags(self): return bytearray(int(i in self.pieces) for i in range(4))
+        def has_piece(self, idx): return idx in self.pieces
+        def available_pieces(self): return self.pieces
+
+    # Piece 2 is held by one peer only, so it is the rarest
+    swarm = [ListPeer([0, 1, 2, 3]), ListPeer([0, 1, 3]), ListPeer([0, 3]), ListPeer([1, 3])]
+    pm = make_piece_manager(BLOCK_LEN, [("file.bin", 4 * BLOCK_LEN)], [b"\x00" * 20] * 4)
+    for peer in swarm:
+        pm.peer_has_pieces(peer.available_pieces())
+
+    picked = asyncio.run(pm.reserve_piece_for_peer(swarm[0]))
+    print("Rarest piece reserved:", picked)
+    assert picked == 2
+
+
+def test_blocks_assemble_in_place(tmp_path, make_piece_manager):
+    size = 3 * BLOCK_LEN - 100
+    data = bytes(range(256)) * (size // 256) + bytes(size % 256)
+    pm = make_piece_manager(3 * BLOCK_LEN, [("file.bin", size)], [hashlib.sha1(data).digest()])
+    blocks = [(off, data[off:off + BLOCK_LEN]) for off in range(0, len(data), BLOCK_LEN)]
+
+    async def deliver():
+        # Out of order, with a duplicate block
+        for off, block in (blocks[2], blocks[0], blocks[0]):
+            assert await pm.store_block(0, off, block)
+            assert not pm.piece_complete(0)
+        return await pm.store_block(0, *blocks[1])
+
+    assert asyncio.run(deliver()) is True
+    print("Piece buffers left after completion:", pm.piece_buffers)
+    assert pm.completed[0] and not pm.piece_buffers
+    assert pm.all_pieces_done()
+    assert (tmp_path / "file.bin").read_bytes() == data
+
+
+def test_piece_written_across_files(tmp_path, make_piece_manager):
+    data = bytes(range(256)) * (BLOCK_LEN // 256)
+    pm = make_piece_manager(
+        BLOCK_LEN, [("a.bin", 1000), ("sub/b.bin", BLOCK_LEN - 1000)], [hashlib.sha1(data).digest()]
+    )
+    print("Preallocated sizes:", (tmp_path / "a.bin").stat().st_size, (tmp_path / "sub/b.bin").stat().st_size)
+    assert (tmp_path / "sub/b.bin").stat().st_size == BLOCK_LEN - 1000
+
+    assert asyncio.run(pm.store_block(0, 0, data)) is True
+    # Upload reads cross the file boundary through the same open files
+    assert asyncio.run(pm.read_block(0, 900, 200)) == data[900:1100]
+    pm.close()
+
+    assert (tmp_path / "a.bin").read_bytes() == data[:1000]
+    assert (tmp_path / "sub/b.bin").read_bytes() == data[1000:]
+
+
+def test_reservation_from_piece_flags(make_piece_manager):
+    class FlagPeer:
+        piece_tracker = None
+        def __init__(self, pieces):
+            self.flags = bytearray(8)
+            for idx in pieces:
+                self.flags[idx] = 1
+        def piece_flags(self): return self.flags
+        def available_pieces(self): return [i for i, f in enumerate(self.flags) if f]
+
+    pm = make_piece_manager(BLOCK_LEN, [("file.bin", 8 * BLOCK_LEN)], [b"\x00" * 20] * 8)
+    peer = FlagPeer([1, 3, 5, 6])
+    pm.peer_has_pieces([1, 1, 3, 6])
+
+    async def reserve_all():
+        await pm.mark_piece_completed(5)
+        picks = []
+        while (idx := await pm.reserve_piece_for_peer(peer)) is not None and idx not in picks:
+            picks.append(idx)
+        return picks
+
+    picks = asyncio.run(reserve_all())
+    print("Reserved in order:", picks)
+    # 3 and 6 are equally rare; either may come first
+    assert sorted(picks[:2]) == [3, 6] and picks[2] == 1
+
+
+def test_rarity_follows_swarm_changes(make_piece_manager):
+    pm = make_piece_manager(BLOCK_LEN, [("file.bin", 4 * BLOCK_LEN)], [b"\x00" * 20] * 4)
+
+    class TrackedPeer:
+        def __init__(self, pieces):
+            self.pieces = pieces
+            self.piece_tracker = pm
+            pm.peer_has_pieces(pieces)
+        def piece_flags(self): return bytearray(int(i in self.pieces) for i in range(4))
+        def has_piece(self, idx): return idx in self.pieces
+        def available_pieces(self): return self.pieces
+
+    seeder = TrackedPeer([0, 1, 2, 3])
+    partial = TrackedPeer([0, 1, 3])
+    TrackedPeer([0, 1, 3])
+
+    async def scenario():
+        first = await pm.reserve_piece_for_peer(seeder)
+        await pm.release_piece(first, seeder)
+        pm.peer_lost_pieces(partial.available_pieces())  # partial disconnects
+        pm.peer_has_pieces([2, 2])                      # piece 2 gets common
+        second = await pm.reserve_piece_for_peer(seeder)
+        return first, second
+
+    first, second = asyncio.run(scenario())
+    print("Rarest before/after swarm change:", first, second)
+    assert first == 2 and second in (0, 1, 3)
+    assert list(pm.availability) == [2, 2, 3, 2]
+
+
+def test_release_after_availability_grew(make_piece_manager):
+    class OnePiecePeer:
+        piece_tracker = None
+        def __init__(self):
+            self.flags = bytearray(b"\x01\x00")
+        def piece_flags(self): return self.flags
+        def has_piece(self, idx): return self.flags[idx] == 1
+        def available_pieces(self): return [0]
+
+    pm = make_piece_manager(BLOCK_LEN, [("file.bin", 2 * BLOCK_LEN)], [b"\x00" * 20] * 2)
+    peer = OnePiecePeer()
+
+    async def scenario():
+        first = await pm.reserve_piece_for_peer(peer)
+        for _ in range(3):
+            pm.peer_has_pieces([0])  # More peers announce it while reserved
+        await pm.release_piece(first, peer)
+        return first, await pm.reserve_piece_for_peer(peer)
+
+    first, again = asyncio.run(scenario())
+    print("Reserved, then again after release:", first, again)
+    assert first == 0 and again == 0
+    pm.peer_has_pieces([0])
+    pm.peer_lost_pieces([0])
+
+
+def test_piece_buffers_are_recycled(make_piece_manager):
+    pm = make_piece_manager(
+        BLOCK_LEN, [("file.bin", 3 * BLOCK_LEN - 10)],
+        [hashlib.sha1(bytes(BLOCK_LEN)).digest()] * 2 + [hashlib.sha1(bytes(BLOCK_LEN - 10)).digest()],
+    )
+
+    async def download():
+        await pm.store_block(0, 0, bytes(BLOCK_LEN))
+        pooled = pm._buffer_pool[-1]
+        await pm.store_block(1, 0, b"\x01" * 100)   # partial, reuses the pooled buffer
+        assert pm.piece_buffers[1] is pooled
+        await pm.store_block(1, 0, bytes(BLOCK_LEN))
+        await pm.store_block(2, 0, bytes(BLOCK_LEN - 10))
+
+    asyncio.run(download())
+    print("Pooled buffers:", len(pm._buffer_pool))
+    assert all(pm.completed) and len(pm._buffer_pool) == 1
+
+
+def test_piece_spanning_three_files(tmp_path, make_piece_manager):
+    # Piece 1 starts inside a.bin, covers all of b.bin and ends inside c.bin
+    data = bytes(range(256)) * (2 * BLOCK_LEN // 256)
+    files = [("a.bin", BLOCK_LEN + 100), ("b.bin", 300), ("empty.bin", 0), ("c.bin", BLOCK_LEN - 400)]
+    pieces = [hashlib.sha1(data[:BLOCK_LEN]).digest(), hashlib.sha1(data[BLOCK_LEN:]).digest()]
+
+    pm = make_piece_manager(BLOCK_LEN, files, pieces)
+    assert asyncio.run(pm.store_block(1, 0, data[BLOCK_LEN:])) is True
+    assert asyncio.run(pm.read_block(1, 50, 400)) == data[BLOCK_LEN + 50:BLOCK_LEN + 450]
+    pm.close()
+
+    print("File sizes:", [(tmp_path / n).stat().st_size for n in ("a.bin", "b.bin", "c.bin")])
+    assert (tmp_path / "b.bin").read_bytes() == data[BLOCK_LEN + 100:BLOCK_LEN + 400]
+    assert (tmp_path / "c.bin").read_bytes() == data[BLOCK_LEN + 400:]
+
+    # A fresh manager finds piece 1 on disk and piece 0 missing
+    pm = make_piece_manager(BLOCK_LEN, files, pieces)
+    pm.verify_existing_data()
+    assert list(pm.completed) == [0, 1]
+
+
+def test_verify_skips_preallocated_space(tmp_path, make_piece_manager):
+    # Only the first piece existed before startup; the rest is preallocated zeros
+    (tmp_path / "file.bin").write_bytes(bytes(BLOCK_LEN))
+    pm = make_piece_manager(
+        BLOCK_LEN, [("file.bin", 2 * BLOCK_LEN)], [hashlib.sha1(bytes(BLOCK_LEN)).digest()] * 2
+    )
+    pm.verify_existing_data()
+
+    print("Completed after verify:", list(pm.completed))
+    assert list(pm.completed) == [1, 0]
+
+
+def test_verify_off_loop(tmp_path, make_piece_manager):
+    (tmp_path / "file.bin").write_bytes(bytes(BLOCK_LEN) + b"\x07" * BLOCK_LEN)
+    pm = make_piece_manager(
+        BLOCK_LEN, [("file.bin", 2 * BLOCK_LEN)],
+        [b"\x00" * 20, hashlib.sha1(b"\x07" * BLOCK_LEN).digest()],
+    )
+
+    async def verify():
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                ticks += 1
+                await asyncio.sleep(0)
+
+        task = asyncio.create_task(ticker())
+        await pm.verify_existing_data_async()
+        task.cancel()
+        return ticks
+
+    ticks = asyncio.run(verify())
+    print("Loop ticks during verification:", ticks)
+    assert list(pm.completed) == [0, 1] and ticks > 0
+
+
+def test_close_waits_for_running_reads(make_piece_manager):
+    pm = make_piece_manager(BLOCK_LEN, [("file.bin", BLOCK_LEN)], [b"\x00" * 20])
+    pm._write_piece_to_disk(0, b"\x05" * BLOCK_LEN)
+    pm._set_completed(0)
+
+    started = threading.Event()
+    read_sync = pm._read_block_sync
+
+    def slow_read(*args):
+        started.set()
+        time.sleep(0.05)  # Still reading when close() is called
+        return read_sync(*args)
+
+    pm._read_block_sync = slow_read
+
+    async def scenario():
+        read = asyncio.ensure_future(pm.read_block(0, 0, BLOCK_LEN))
+        await asyncio.to_thread(started.wait)
+        pm.close()
+        return await read
+
+    block = asyncio.run(scenario())
+    print("Block read across close():", None if block is None else len(block))
+    assert block == b"\x05" * BLOCK_LEN
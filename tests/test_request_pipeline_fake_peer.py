@@ -1,29 +1,11 @@
 import asyncio
 import hashlib
+import threading
 
 import pytest
 
 from peer.message_types import MessageID, BLOCK_LEN
 from peer.request_pipeline import RequestPipeline
-from pieces.piece_manager import PieceManager
-
-
-# -----------------------------
-# Fake Torrent Metadata
-# -----------------------------
-class FakeMeta:
-    """
-    Minimal fake torrent metadata for testing:
-    - 1 piece
-    - piece_length = BLOCK_LEN
-    - SHA1 hash matches FakePeer block data (all zeros)
-    """
-    piece_length = BLOCK_LEN
-    total_length = BLOCK_LEN
-    files = [{"length": BLOCK_LEN, "path": "file.bin"}]
-
-    raw_piece = bytes(BLOCK_LEN)  # FakePeer sends zeros
-    pieces = [hashlib.sha1(raw_piece).digest()]
 
 
 # -----------------------------
@@ -44,6 +26,7 @@ class FakePeer:
         self.unchoked = False
         self.piece_sent = False
         self.writer = self
+        self.piece_tracker = None
 
     async def drain(self):
         pass
@@ -54,6 +37,16 @@ class FakePeer:
             # pipeline puts requests here; FakePeer will respond to them
             await self.requests.put(payload)
 
+    def send_requests(self, index, begin, end):
+        for offset in range(begin, end, BLOCK_LEN):
+            length = min(BLOCK_LEN, end - offset)
+            payload = index.to_bytes(4, "big") + offset.to_bytes(4, "big") + length.to_bytes(4, "big")
+            self.sent_messages.append((MessageID.REQUEST, payload))
+            self.requests.put_nowait(payload)
+
+    async def flush(self):
+        pass
+
     async def read_message(self):
         # 1) First call â†’ UNCHOKE
         if not self.unchoked:
@@ -69,7 +62,7 @@ class FakePeer:
             begin = int.from_bytes(req[4:8], "big")
             length = int.from_bytes(req[8:12], "big")
 
-            # Fake block matches FakeMeta (all zeros)
+            # Fake block matches the test piece's hash (all zeros)
             block = bytes(length)
 
             payload = (
@@ -104,6 +97,9 @@ class FakePeer:
     def has_piece(self, idx):
         return idx == 0
 
+    def piece_flags(self):
+        return bytearray(b"\x01")  # One-piece torrent
+
     def available_pieces(self):
         return [0]
 
@@ -112,7 +108,7 @@ class FakePeer:
 # The actual test
 # -----------------------------
 @pytest.mark.asyncio
-async def test_pipeline_download_fake_peer(tmp_path):
+async def test_pipeline_download_fake_peer(tmp_path, make_piece_manager):
     """
     Tests that RequestPipeline:
     - waits for UNCHOKE
@@ -122,7 +118,8 @@ async def test_pipeline_download_fake_peer(tmp_path):
     - writes final piece to disk
     """
 
-    pm = PieceManager(FakeMeta(), download_dir=tmp_path)
+    # One piece of BLOCK_LEN; its hash matches FakePeer's all-zero block
+    pm = make_piece_manager(BLOCK_LEN, [("file.bin", BLOCK_LEN)], [hashlib.sha1(bytes(BLOCK_LEN)).digest()])
     peer = FakePeer()
 
     pipeline = RequestPipeline(peer, pm)
@@ -140,9 +137,170 @@ async def test_pipeline_download_fake_peer(tmp_path):
     assert any(m[0] == MessageID.REQUEST for m in peer.sent_messages)
 
     # 3) Piece should be marked as completed
-    assert pm.completed[0] is True
+    assert pm.completed[0] == 1
 
     # 4) File must be written
     output_file = tmp_path / "file.bin"
     assert output_file.exists()
     assert output_file.stat().st_size == BLOCK_LEN
+
+
+class QueuePeer:
+    """Peer whose messages are fed by the test; counts read_message() calls."""
+
+    def __init__(self, num_pieces=1):
+        self.incoming = asyncio.Queue()
+        self.requested = []
+        self.reads = 0
+        self.cancelled_reads = 0
+        self.piece_tracker = None
+        self.flags = bytearray(b"\x01") * num_pieces  # Has every piece
+
+    def piece_flags(self):
+        return self.flags
+
+    def available_pieces(self):
+        return range(len(self.flags))
+
+    def send_requests(self, index, begin, end):
+        self.requested.append((index, begin, end))
+
+    async def flush(self):
+        pass
+
+    async def read_message(self):
+        self.reads += 1
+        try:
+            return await self.incoming.get()
+        except asyncio.CancelledError:
+            self.cancelled_reads += 1
+            raise
+
+
+@pytest.mark.asyncio
+async def test_pending_read_survives_piece_completed_elsewhere(make_piece_manager):
+    pm = make_piece_manager(
+        BLOCK_LEN, [("file.bin", 2 * BLOCK_LEN)], [hashlib.sha1(bytes(BLOCK_LEN)).digest()] * 2
+    )
+    peer = QueuePeer()
+    pipeline = RequestPipeline(peer, pm)
+
+    first = asyncio.create_task(pipeline.download_piece(0))
+    await asyncio.sleep(0)
+    await pm.mark_piece_completed(0)  # Another peer delivered it
+    assert await first is True
+    print("Reads after first piece:", peer.reads, "cancelled:", peer.cancelled_reads)
+    assert peer.cancelled_reads == 0
+
+    # The same outstanding read delivers the next piece's block
+    second = asyncio.create_task(pipeline.download_piece(1))
+    await peer.incoming.put((MessageID.PIECE, (1).to_bytes(4, "big") + bytes(4) + bytes(BLOCK_LEN)))
+    assert await second is True
+    assert pm.completed[1] and peer.reads == 1
+
+
+@pytest.mark.asyncio
+async def test_pipeline_refills_up_to_depth(make_piece_manager):
+    pm = make_piece_manager(
+        5 * BLOCK_LEN, [("file.bin", 5 * BLOCK_LEN)], [hashlib.sha1(bytes(5 * BLOCK_LEN)).digest()]
+    )
+    peer = QueuePeer()
+    pipeline = RequestPipeline(peer, pm, pipeline_depth=2)
+
+    def block(n):
+        return MessageID.PIECE, bytes(4) + (n * BLOCK_LEN).to_bytes(4, "big") + bytes(BLOCK_LEN)
+
+    # Block 1 arrives twice; the duplicate must not open an extra slot
+    for n in (1, 1, 0, 2, 3, 4):
+        peer.incoming.put_nowait(block(n))
+    assert await pipeline.download_piece(0) is True
+
+    print("Requested ranges:", peer.requested)
+    assert peer.requested == [
+        (0, 0, 2 * BLOCK_LEN),
+        (0, 2 * BLOCK_LEN, 3 * BLOCK_LEN),
+        (0, 3 * BLOCK_LEN, 4 * BLOCK_LEN),
+        (0, 4 * BLOCK_LEN, 5 * BLOCK_LEN),
+    ]
+
+
+@pytest.mark.asyncio
+async def test_endgame_peer_waits_for_hash_result(make_piece_manager):
+    pm = make_piece_manager(BLOCK_LEN, [("file.bin", BLOCK_LEN)], [hashlib.sha1(b"\x01" * BLOCK_LEN).digest()])
+    # Hold the hash check until B has had its block processed
+    release = threading.Event()
+    check_and_write = pm._check_and_write
+
+    def gated_check(*args):
+        release.wait()
+        return check_and_write(*args)
+
+    pm._check_and_write = gated_check
+
+    peer_a, peer_b = QueuePeer(), QueuePeer()
+    try:
+        assert await pm.reserve_piece_for_peer(peer_a) == 0
+        assert await pm.reserve_piece_for_peer(peer_b) == 0  # Endgame
+        download_a = asyncio.create_task(RequestPipeline(peer_a, pm).download_piece(0))
+        download_b = asyncio.create_task(RequestPipeline(peer_b, pm).download_piece(0))
+
+        bad = MessageID.PIECE, bytes(8) + bytes(BLOCK_LEN)
+        await peer_a.incoming.put(bad)  # A completes the piece with bad data
+        await asyncio.sleep(0.01)
+        await peer_b.incoming.put(bad)  # B's block lands while A's is hashed
+        await asyncio.sleep(0.01)
+        assert not download_b.done()
+
+        release.set()
+        result_a, result_b = await download_a, await download_b
+        print("A:", result_a, "B:", result_b, "in progress:", pm.in_progress)
+        assert result_a is False and result_b is True
+        assert pm.completed[0] == 0 and 0 not in pm.in_progress
+
+        # The piece is back up for regular reservation
+        assert await pm.reserve_piece_for_peer(peer_b) == 0
+    finally:
+        release.set()  # Before the fixture closes pm and joins its threads
+
+
+class UploadPeer:
+    """Records writes and drains; drain() blocks until released."""
+
+    def __init__(self):
+        self.am_choking = False
+        self.events = []
+        self.release = asyncio.Event()
+
+    async def send(self, msg_id, payload=b"", drain=True):
+        self.events.append(("send", drain))
+
+    async def drain(self):
+        self.events.append(("drain",))
+        await self.release.wait()
+
+
+class DiskStub:
+    async def read_block(self, index, begin, length):
+        return bytes(length)
+
+
+@pytest.mark.asyncio
+async def test_upload_replies_drain_in_background():
+    peer = UploadPeer()
+    pipeline = RequestPipeline(peer, DiskStub())
+    request = (0).to_bytes(4, "big") + (0).to_bytes(4, "big") + (16384).to_bytes(4, "big")
+
+    # The reply is written and the handler returns while the drain is pending
+    await pipeline._handle_request(request)
+    await asyncio.sleep(0)
+    assert peer.events == [("send", False), ("drain",)]
+
+    # The next reply waits until the previous drain completes
+    second = asyncio.create_task(pipeline._handle_request(request))
+    await asyncio.sleep(0.01)
+    assert len(peer.events) == 2
+    peer.release.set()
+    await second
+    print("Upload events:", peer.events)
+    assert peer.events[2] == ("send", False)
+    pipeline._upload_drain.cancel()